@@ -0,0 +1,150 @@
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+# ==========================================
+# PRE-AGGREGATED MARKET ANALYTICS
+# ==========================================
+# Charts are drawn from fixed bins, never from raw rows:
+#   views x duration   20 log10-view bins x 13 duration bins (+ mean log views per duration)
+#   engagement         0.5% bins up to 20% (last bin is overflow)
+#   publish time       weekday x hour (UTC) counts and summed log views
+# Adding rows is one vectorized pass. Each video keeps a record of the bins it
+# landed in, so a fresher snapshot of the same video replaces its old
+# contribution instead of counting twice. Rendering costs the same at 50 rows
+# or 100k, and figures are cached by the bins' version.
+
+VIEW_LOG_EDGES = np.arange(0, 10.5, 0.5)
+DURATION_EDGES = np.array([0, 1, 3, 5, 8, 10, 15, 20, 30, 45, 60, 90, 120, np.inf])
+DURATION_LABELS = ["<1", "1-3", "3-5", "5-8", "8-10", "10-15", "15-20", "20-30", "30-45", "45-60", "60-90", "90-120", "120+"]
+ENGAGEMENT_EDGES = np.append(np.arange(0, 20.5, 0.5), np.inf)
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+N_VIEWS, N_DURATION, N_ENGAGEMENT = len(VIEW_LOG_EDGES) - 1, len(DURATION_EDGES) - 1, len(ENGAGEMENT_EDGES) - 1
+
+# Styled once at import: rcParams are process-global, and sessions render charts concurrently
+sns.set_theme(style="whitegrid")
+
+
+def _bin(values, edges):
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+
+
+class MarketBins:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.view_duration = np.zeros(N_DURATION * N_VIEWS, dtype=np.int64)
+        self.duration_logviews = np.zeros(N_DURATION)
+        self.engagement = np.zeros(N_ENGAGEMENT, dtype=np.int64)
+        self.publish_counts = np.zeros(7 * 24, dtype=np.int64)
+        self.publish_logviews = np.zeros(7 * 24)
+        self.placed = {}  # video id -> (view/duration cell, duration bin, engagement bin, publish cell or -1, log views)
+
+    def __len__(self):
+        return len(self.placed)
+
+    def _apply(self, cells, sign):
+        vd, dur, eng, pub, logv = cells
+        np.add.at(self.view_duration, vd, sign)
+        np.add.at(self.duration_logviews, dur, sign * logv)
+        np.add.at(self.engagement, eng, sign)
+        has_time = pub >= 0
+        np.add.at(self.publish_counts, pub[has_time], sign)
+        np.add.at(self.publish_logviews, pub[has_time], sign * logv[has_time])
+
+    def add(self, df):
+        """Bin every row of df, replacing earlier contributions of the same videos."""
+        if df.empty:
+            return
+        df = df.drop_duplicates('Video ID', keep='last')
+        logv = np.log10(df['Views'].to_numpy(dtype=np.float64) + 1)
+        dur = _bin(df['Duration'].fillna(0).to_numpy(dtype=np.float64), DURATION_EDGES)
+        vd = dur * N_VIEWS + _bin(logv, VIEW_LOG_EDGES)
+        eng = _bin(df['Engagement'].fillna(0).to_numpy(dtype=np.float64), ENGAGEMENT_EDGES)
+        published = pd.to_datetime(df['Published At'] if 'Published At' in df else pd.Series(pd.NaT, index=df.index), utc=True, errors='coerce')
+        pub = np.where(published.isna(), -1, published.dt.dayofweek.fillna(0) * 24 + published.dt.hour.fillna(0)).astype(np.int64)
+
+        ids = df['Video ID'].tolist()
+        with self.lock:
+            old = [self.placed[vid] for vid in ids if vid in self.placed]
+            if old:
+                self._apply(tuple(np.array(col) for col in zip(*old)), -1)
+            self._apply((vd, dur, eng, pub, logv), 1)
+            self.placed.update(zip(ids, zip(vd.tolist(), dur.tolist(), eng.tolist(), pub.tolist(), logv.tolist())))
+            self.version += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'view_duration': self.view_duration.reshape(N_DURATION, N_VIEWS).copy(),
+                'duration_logviews': self.duration_logviews.copy(),
+                'engagement': self.engagement.copy(),
+                'publish_counts': self.publish_counts.reshape(7, 24).copy(),
+                'publish_logviews': self.publish_logviews.reshape(7, 24).copy(),
+                'videos': len(self.placed),
+            }
+
+
+class HistoryBins(MarketBins):
+    """MarketBins fed incrementally from history.MarketHistory (only rows appended since last refresh)."""
+
+    COLUMNS = ['Video ID', 'Views', 'Duration', 'Engagement', 'Published At']
+
+    def __init__(self):
+        super().__init__()
+        self.last_rowid = 0
+        self.refresh_lock = threading.Lock()
+
+    def refresh(self, history):
+        with self.refresh_lock:
+            for last_rowid, chunk in history.rows_after(self.last_rowid, self.COLUMNS):
+                self.add(chunk)
+                self.last_rowid = last_rowid
+        return self.version
+
+
+def _png(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=110, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def render_charts(snapshot):
+    """PNG bytes per chart, drawn from a MarketBins snapshot."""
+    charts = {}
+    counts = snapshot['view_duration']
+    per_duration = counts.sum(1)
+
+    fig = Figure(figsize=(9, 4))
+    ax = fig.subplots()
+    view_labels = [f"{10 ** e:,.0f}" if e == int(e) else "" for e in VIEW_LOG_EDGES[:-1]]
+    sns.heatmap(np.log1p(counts.T[::-1]), ax=ax, cmap="Reds", cbar_kws={'label': 'log(1 + videos)'},
+                xticklabels=DURATION_LABELS, yticklabels=view_labels[::-1])
+    mean_logv = np.divide(snapshot['duration_logviews'], per_duration, out=np.full(N_DURATION, np.nan), where=per_duration > 0)
+    ax.plot(np.arange(N_DURATION) + 0.5, N_VIEWS - mean_logv / 0.5, color="#ff8c00", marker="o", label="mean views")
+    ax.set(xlabel="Duration (min)", ylabel="Views", title="Views vs. Duration")
+    ax.legend(loc="upper right")
+    charts['Views vs. Duration'] = _png(fig)
+
+    fig = Figure(figsize=(9, 3.2))
+    ax = fig.subplots()
+    edges = ENGAGEMENT_EDGES[:-1]
+    ax.bar(edges, snapshot['engagement'], width=0.45, align="edge", color="#e60000")
+    ax.set(xlabel="Engagement % ((likes + comments) / views, last bar = 20%+)", ylabel="Videos", title="Engagement Distribution")
+    charts['Engagement Distribution'] = _png(fig)
+
+    fig = Figure(figsize=(9, 3.6))
+    ax = fig.subplots()
+    publish = snapshot['publish_counts']
+    mean_views = np.divide(snapshot['publish_logviews'], publish, out=np.full(publish.shape, np.nan), where=publish > 0)
+    labels = np.where(publish > 0, np.char.mod("%.1f", np.nan_to_num(mean_views)), "")
+    sns.heatmap(publish, ax=ax, cmap="Oranges", yticklabels=WEEKDAYS, xticklabels=range(24), cbar_kws={'label': 'videos published'},
+                annot=labels, fmt="", annot_kws={'size': 6})
+    ax.set(xlabel="Hour (UTC)", ylabel="", title="Publish Time (cells show mean log10 views)")
+    charts['Publish Time Heatmap'] = _png(fig)
+    return charts
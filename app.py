@@ -4,15 +4,37 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
 from textblob import TextBlob
 from wordcloud import WordCloud
 from collections import Counter
 import google.generativeai as genai
 from youtube_transcript_api import YouTubeTranscriptApi
 import isodate 
+import re
+import os
+import hashlib
+import tempfile
 import requests
 from PIL import Image
 from io import BytesIO
+from similarity import SimilarityIndex
+from jobs import JobQueue
+from resilience import youtube_api, transcript_api, thumbnail_cdn, TimeoutSession
+from model_router import ModelRouter, MODEL_TIMEOUT
+from transcript_prep import prepare_transcript, format_savings
+from thumbnail_features import ThumbnailFeatureExtractor, FEATURE_COLUMNS
+from phash_index import PHashIndex, group_near_duplicates
+from storage import data_path
+from crawler import crawl_search, crawl_range
+from virality import ViralityScorer, virality_scope
+from history import MarketHistory, COLUMNS as HISTORY_COLUMNS
+from export import FORMATS as EXPORT_FORMATS, frame_chunks, write_export
+from autocomplete import PrefixIndex, QUERY_WEIGHT, normalize as normalize_query
+from analytics import MarketBins, HistoryBins, render_charts
+from batch import AIBatch
+from video_cache import VideoStatsCache
+from query_diff import compare_results, summarize as summarize_diff, jaccard
 
 # ==========================================
 # 1. CONFIG & THEME (PROFESSIONAL BRIGHT)
@@ -98,6 +120,18 @@ if 'search_done' not in st.session_state: st.session_state.search_done = False
 if 'df' not in st.session_state: st.session_state.df = pd.DataFrame()
 if 'all_tags' not in st.session_state: st.session_state.all_tags = []
 if 'selected_video_id' not in st.session_state: st.session_state.selected_video_id = None
+if 'jobs' not in st.session_state: st.session_state.jobs = {}
+if 'query' not in st.session_state: st.session_state.query = ''
+if 'region' not in st.session_state: st.session_state.region = None
+if 'virality_scope' not in st.session_state: st.session_state.virality_scope = None
+if 'rpm' not in st.session_state: st.session_state.rpm = None
+if 'jobs_seen' not in st.session_state: st.session_state.jobs_seen = set()
+if 'data_version' not in st.session_state: st.session_state.data_version = 0
+if 'memo' not in st.session_state: st.session_state.memo = {}
+if 'notices' not in st.session_state: st.session_state.notices = []
+if 'export' not in st.session_state: st.session_state.export = None
+if 'batch' not in st.session_state: st.session_state.batch = None
+if 'batch_merged' not in st.session_state: st.session_state.batch_merged = False
 
 # ==========================================
 # 3. SIDEBAR (BRANDED & KEY INPUTS)
@@ -131,20 +165,92 @@ with st.sidebar:
     st.divider()
     country_code = st.selectbox("Target Region", ["US", "IN", "GB", "CA", "AU"], index=0)
     rpm = st.slider("RPM Calculator ($)", 0.5, 20.0, 3.0)
+    channel_limit = st.select_slider("Channel Catalog Limit", options=[50, 200, 500, 1000, 2000, 5000], value=1000)
+    crawl_days = st.select_slider("Deep Crawl Period (days)", options=[30, 90, 180, 365, 730, 1825], value=365)
+    crawl_budget = st.select_slider("Deep Crawl Quota Budget (units)", options=[1000, 2000, 5000, 10000], value=2000)
+    virality_baseline = st.radio("Virality Baseline", ["All data", "Region", "Niche"], horizontal=True,
+                                 help="Virality Score is a percentile against every video seen in this scope, so scores stay comparable across searches.")
 
 # ==========================================
 # 4. CORE FUNCTIONS
 # ==========================================
+def key_hash(api_key):
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+def youtube_execute(request, api_key, key=None, hedge=True, charge=None):
+    # Fresh Http per attempt: httplib2 isn't thread-safe and hedged attempts run concurrently.
+    # Its socket timeout matches the attempt timeout, so a hung call gives its worker back.
+    # `charge` is called before every attempt (quota accounting, see crawler.py).
+    def execute():
+        if charge is not None:
+            charge()
+        http = build_http()
+        http.timeout = youtube_api.timeout
+        return request.execute(http=http)
+    # Keys carry a hash of the API key: sessions on different keys (quota, restrictions) never share a call or a stale result
+    if key is not None:
+        key = (key_hash(api_key), *key)
+    return youtube_api.call(execute, key=key, hedge=hedge)
+
+def fetch_image_bytes(image_url):
+    def download():
+        response = requests.get(image_url, timeout=thumbnail_cdn.timeout)
+        response.raise_for_status()
+        return response.content
+    return thumbnail_cdn.call(download, key=image_url)
+
+@st.cache_resource
+def get_thumbnail_extractor():
+    # Feature cache is keyed by image hash and shared by all sessions
+    return ThumbnailFeatureExtractor(fetch_image_bytes)
+
+@st.cache_resource
+def get_phash_index():
+    # Persistent: reuploads are recognised across searches and restarts
+    return PHashIndex(data_path("thumb_hashes.sqlite"))
+
+def mark_near_duplicates(df):
+    index = get_phash_index()
+    index.add_frame(df)
+    groups = group_near_duplicates(df, index)
+    df['Dup Group'] = [f"G{g}" if g else "" for g in groups]
+    # The most-viewed copy in each group counts as the original, the rest as reuploads
+    rank = df[df['Dup Group'] != ""].groupby('Dup Group')['Views'].rank(method='first', ascending=False)
+    df['Is Reupload'] = False
+    df.loc[rank.index, 'Is Reupload'] = rank > 1
+    return df
+
 @st.cache_data(show_spinner=False)
-def get_market_data(api_key, query, max_results=50):
+def get_market_data(api_key, query, region, max_results=50, crawl_days=None, quota_budget=2000):
     youtube = build('youtube', 'v3', developerKey=api_key)
-    search_req = youtube.search().list(part="snippet", q=query, type="video", regionCode=country_code, maxResults=max_results, order="viewCount").execute()
-    video_ids = [item['id']['videoId'] for item in search_req.get('items', [])]
-    
-    stats_req = youtube.videos().list(part="snippet,statistics,contentDetails", id=",".join(video_ids)).execute()
-    
+    if crawl_days:
+        # Deep Crawl: parallel publishedAfter/Before windows get past the ~500-result ceiling
+        def search_page(after, before, page_token, charge):
+            # 100 units per attempt: no hedged duplicates, and every retry is charged to the crawl budget
+            return youtube_execute(youtube.search().list(part="id", q=query, type="video", regionCode=region, maxResults=50, order="viewCount", publishedAfter=after, publishedBefore=before, pageToken=page_token),
+                                   api_key, key=("crawl", query, region, after, before, page_token), hedge=False, charge=charge)
+        video_ids, crawl_report = crawl_search(search_page, *crawl_range(crawl_days), budget_units=quota_budget)
+    else:
+        search_req = youtube_execute(youtube.search().list(part="snippet", q=query, type="video", regionCode=region, maxResults=max_results, order="viewCount"), api_key, key=("search", query, region, max_results), hedge=False)  # 100 units: never hedge
+        video_ids = [item['id']['videoId'] for item in search_req.get('items', [])]
+    data, all_tags = fetch_video_rows(youtube, api_key, video_ids)
+    df = to_market_frame(data)
+    if crawl_days:
+        df = df.sort_values('Views', ascending=False, ignore_index=True) if not df.empty else df
+        df.attrs['crawl'] = crawl_report
+    return df, all_tags
+
+@st.cache_resource
+def get_video_stats():
+    # Per-video stats shared by every query, region and session; entries expire after a few minutes
+    return VideoStatsCache()
+
+def fetch_video_rows(youtube, api_key, video_ids):
+    # Only IDs missing from (or stale in) the stats cache reach videos().list, 50 per call
+    def list_videos(batch):
+        return youtube_execute(youtube.videos().list(part="snippet,statistics,contentDetails", id=",".join(batch)), api_key, key=("videos", tuple(batch))).get('items', [])
     data, all_tags = [], []
-    for item in stats_req.get('items', []):
+    for item in get_video_stats().get_many(video_ids, list_videos):
         stats, snippet, content = item['statistics'], item['snippet'], item['contentDetails']
         
         views = int(stats.get('viewCount', 0))
@@ -168,188 +274,694 @@ def get_market_data(api_key, query, max_results=50):
             'Likes': likes,
             'Comments': comments,
             'Engagement': round(((likes + comments) / views * 100) if views > 0 else 0, 2),
-            'Earnings': round((views / 1000) * rpm, 2),
             'Virality Raw': (views * 0.5) + (likes * 50) + (comments * 100),
             'Link': f"https://www.youtube.com/watch?v={item['id']}",
             'Published': snippet['publishedAt'][:10],
+            'Published At': snippet['publishedAt'],
             'Duration': duration_mins,
             'Tags': tags
         })
-    
-    df = pd.DataFrame(data)
+    return data, all_tags
+
+def to_market_frame(data):
+    # Virality Score is added after the fetch, against the running sketches (see score_virality)
+    return pd.DataFrame(data)
+
+@st.cache_resource
+def get_virality_scorer():
+    # Persistent sketches: a score means the same thing across searches and restarts
+    return ViralityScorer(data_path("virality.sqlite"))
+
+def price_earnings(df):
+    # Earnings follow the RPM slider, so they are derived per session, never cached with the fetch
     if not df.empty:
-        df['Virality Score'] = (df['Virality Raw'] / df['Virality Raw'].max()) * 10
-    return df, all_tags
+        df['Earnings'] = (df['Views'] / 1000 * rpm).round(2)
+    st.session_state.rpm = rpm
+    return df
+
+def score_virality(df, baseline):
+    scope = virality_scope(baseline, st.session_state.region, st.session_state.query)
+    df['Virality Score'] = get_virality_scorer().score(scope, df)
+    st.session_state.virality_scope = scope
+    return df
+
+@st.cache_resource
+def get_market_history():
+    # Every fetched result set, kept for exports across sessions and restarts
+    return MarketHistory(data_path("history.sqlite"))
+
+@st.cache_resource
+def get_query_index():
+    # Past queries & tags for autocomplete, seeded from history (nothing is cached yet after a restart)
+    index = PrefixIndex()
+    history = get_market_history()
+    index.add_many((query, QUERY_WEIGHT * n) for query, n in history.query_counts())
+    index.add_many(history.tag_counts().items())
+    return index
+
+@st.cache_resource
+def get_cached_searches():
+    # search_signature() of every call get_market_data / get_channel_data has cached this process
+    return set()
+
+def search_signature(mode, query):
+    # What the fetch for `mode` is cached on (key, query as typed, sidebar settings): ⚡ only when a click would hit it
+    if mode == "📺 Channel Catalog":
+        return key_hash(api_key), mode, query, channel_limit
+    if mode == "🛰️ Deep Crawl":
+        return key_hash(api_key), mode, query, country_code, crawl_days, crawl_budget
+    return key_hash(api_key), mode, query, country_code
+
+def remember_query(query, tags, signature):
+    index = get_query_index()
+    index.add(query, QUERY_WEIGHT, cached=True)
+    index.add_many(Counter(tags).items())
+    get_cached_searches().add(signature)
+
+CHANNEL_ID_RE = re.compile(r"(?:^|/channel/)(UC[\w-]{22})$")
+
+def channel_lookup(channel):
+    # channels().list parameters for a channel ID (UC...), @handle, or channel URL
+    # (youtube.com/@handle/videos, /channel/UC..., /user/name; query string ignored)
+    channel = re.split(r"[?#]", channel.strip())[0].rstrip('/')
+    if '/' not in channel:
+        match = CHANNEL_ID_RE.search(channel)
+        return {'id': match.group(1)} if match else {'forHandle': f"@{channel.lstrip('@')}"}
+    segments = channel.split('/')
+    for i, segment in enumerate(segments):
+        if segment.startswith('@') and len(segment) > 1:
+            return {'forHandle': segment}
+        if segment in ("channel", "user") and i + 1 < len(segments):
+            if segment == "user":
+                return {'forUsername': segments[i + 1]}
+            match = CHANNEL_ID_RE.search("/" + "/".join(segments[i:i + 2]))
+            if match:
+                return {'id': match.group(1)}
+    raise ValueError(f"Can't read a channel from '{channel}'. Use an @handle, channel ID or a youtube.com/@handle or /channel/ URL.")
+
+def resolve_uploads_playlist(youtube, api_key, channel):
+    params = channel_lookup(channel)
+    resp = youtube_execute(youtube.channels().list(part="snippet,contentDetails", **params), api_key, key=("channel", *params.items()))
+    if not resp.get('items'):
+        raise ValueError(f"Channel '{channel}' not found. Use an @handle, channel ID or channel URL.")
+    item = resp['items'][0]
+    return item['snippet']['title'], item['contentDetails']['relatedPlaylists']['uploads']
+
+@st.cache_data(show_spinner=False)
+def get_channel_data(api_key, channel, max_videos=1000):
+    # Back catalog via the uploads playlist: 1 unit per 50 videos (+1 per 50 for stats),
+    # instead of 100 units per 50 results with search().list
+    youtube = build('youtube', 'v3', developerKey=api_key)
+    channel_title, playlist_id = resolve_uploads_playlist(youtube, api_key, channel)
+    video_ids, page_token = [], None
+    while len(video_ids) < max_videos:
+        page = youtube_execute(youtube.playlistItems().list(part="contentDetails", playlistId=playlist_id, maxResults=50, pageToken=page_token), api_key, key=("uploads", playlist_id, page_token))
+        video_ids.extend(item['contentDetails']['videoId'] for item in page.get('items', []))
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            break
+    data, all_tags = fetch_video_rows(youtube, api_key, video_ids[:max_videos])
+    return to_market_frame(data), all_tags, channel_title
+
+@st.cache_resource
+def get_similarity_index():
+    # Shared across sessions so "similar" covers everything fetched so far
+    return SimilarityIndex()
 
+def fetch_transcript(video_id):
+    # Session timeout matches the attempt timeout, so a hung fetch gives its worker back
+    api = YouTubeTranscriptApi(http_client=TimeoutSession(transcript_api.timeout))
+    return api.fetch(video_id).to_raw_data()
+
+@st.cache_data(show_spinner=False)
 def get_transcript_text(video_id):
     try:
-        return " ".join([t['text'] for t in YouTubeTranscriptApi.get_transcript(video_id)])
+        text = " ".join([t['text'] for t in transcript_api.call(fetch_transcript, video_id, key=video_id)])
     except:
         return None
+    get_similarity_index().upsert(video_id, transcript=text)
+    return text
+
+@st.cache_resource
+def get_model_router():
+    # Shared so latency/error stats accumulate across sessions
+    return ModelRouter(genai.GenerativeModel, generate_kwargs={'request_options': {'timeout': MODEL_TIMEOUT}})
+
+# --- AI FUNCTIONS (MODEL ROUTER PICKS THE MODEL PER TIER) ---
+def with_savings(text, savings):
+    # Per-call token report from the transcript preprocessor, shown under the AI result
+    if savings and savings['saved'] > 0:
+        return f"{text}\n\n---\n*{format_savings(savings)}*"
+    return text
 
-# --- AI FUNCTIONS (FIXED MODEL NAMES) ---
 def ai_forensic_audit(transcript, title, duration, tags):
-    # Fixed to stable gemini-1.0-pro
-    model = genai.GenerativeModel('gemini-1.0-pro') 
-    
+    # Heavy report: strong tier
+    savings = None
     if transcript:
         context_source = "Full Transcript"
-        context_data = transcript[:8000]
+        context_data, savings = prepare_transcript(transcript, token_budget=2000)
     else:
         context_source = "Title & Metadata (Transcript Unavailable)"
         context_data = f"Title: {title}. Tags: {tags}"
 
     prompt = f"Act as a Pro Video Editor. Analyze this content (Source: {context_source}): {context_data}. Output a Markdown report with: 1. Pacing Analysis (Fast/Slow, Est. Cuts/Min). 2. Recommended Tech Stack (Software, Effects). 3. A 3-point Timeline Blueprint (Hook, Middle, End)."
-    return model.generate_content(prompt).text
+    return with_savings(get_model_router().generate("strong", prompt), savings)
 
 def ai_title_generator(transcript, title):
-    # Fixed to stable gemini-1.0-pro
-    model = genai.GenerativeModel('gemini-1.0-pro')
-    prompt = f"Act as MrBeast's Title writer. Here is a video transcript: {transcript[:4000]}. The original title was '{title}'. Give me 5 NEW, high-CTR (Click-Through Rate) title alternatives. Be bold and create curiosity."
-    return model.generate_content(prompt).text
+    # Short creative task: fast tier
+    transcript, savings = prepare_transcript(transcript, token_budget=1000)
+    prompt = f"Act as MrBeast's Title writer. Here is a video transcript: {transcript}. The original title was '{title}'. Give me 5 NEW, high-CTR (Click-Through Rate) title alternatives. Be bold and create curiosity."
+    return with_savings(get_model_router().generate("fast", prompt), savings)
 
 def ai_thumbnail_auditor(image_url):
-    response = requests.get(image_url)
-    img = Image.open(BytesIO(response.content))
-    
-    # Fixed to stable gemini-pro-vision
-    model = genai.GenerativeModel('gemini-pro-vision') 
+    # Image input: vision tier. The image is passed lazily, so a cached audit costs no download
     prompt = "You are a YouTube Thumbnail Expert. Audit this image. Provide: 1. A CTR Score (out of 10). 2. Analysis of its colors, text, and emotion. 3. One actionable tip for improvement."
-    return model.generate_content([prompt, img]).text
+    return get_model_router().generate("vision", [prompt, lambda: Image.open(BytesIO(fetch_image_bytes(image_url)))], cache_key=image_url)
+
+# --- JOB WRAPPERS (run on the worker pool, fetch their own transcript) ---
+def run_forensic_audit(vid, title, duration, tags):
+    transcript = get_transcript_text(vid)
+    analysis = ai_forensic_audit(transcript, title, duration, tags)
+    if not transcript:
+        analysis = "> ⚠️ No transcript found. Metadata-only estimation.\n\n" + analysis
+    return analysis
+
+def run_title_generator(vid, title):
+    transcript = get_transcript_text(vid) or f"Title: {title}"
+    return ai_title_generator(transcript, title)
 
 # ==========================================
 # 5. POPUP MODAL
 # ==========================================
 @st.dialog("Forensic Editing Lab", width="large")
-def open_forensic_lab(vid, title, duration, tags):
+def open_forensic_lab(title, analysis):
     st.markdown(f"### Target: {title}")
-    transcript = get_transcript_text(vid)
-    
-    if not transcript:
-        st.warning("No transcript found. Running metadata-only estimation...")
-
-    with st.spinner("⚙️ Reverse Engineering Timeline..."):
-        analysis = ai_forensic_audit(transcript, title, duration, tags)
-    
     st.success("✅ Analysis Complete")
     st.markdown(analysis)
 
 # ==========================================
-# 6. DASHBOARD UI
+# 6. BACKGROUND JOBS
 # ==========================================
+@st.cache_resource
+def get_job_queue():
+    # One worker pool for all sessions; results outlive reruns
+    return JobQueue(max_workers=4)
+
+def submit_job(key, label, fn, *args, coordinator=False):
+    # One live job per tool & video, so double clicks don't queue duplicates
+    queue = get_job_queue()
+    job = queue.get(st.session_state.jobs.get(key))
+    if job is None or job.done:
+        idle = not queue.pending(st.session_state.jobs.values())
+        st.session_state.jobs[key] = queue.submit(label, fn, *args, coordinator=coordinator)
+        if idle:
+            st.rerun()  # the job monitor only polls while jobs are pending: start it
+
+def show_job(key, error_label="AI Error"):
+    job = get_job_queue().get(st.session_state.jobs.get(key))
+    if job is None:
+        return None
+    if not job.done:
+        st.info(f"⏳ {job.label}: {job.status} ({job.elapsed:.0f}s). Keep browsing, the result will appear here.")
+    elif job.status == "error":
+        st.error(f"{error_label}: {job.error}")
+    else:
+        return job.result
+    return None
+
+def job_monitor():
+    queue = get_job_queue()
+    jobs = [job for job in map(queue.get, st.session_state.jobs.values()) if job]
+    st.markdown("### AI Job Queue")
+    for job in sorted(jobs, key=lambda j: j.submitted, reverse=True):
+        icon = {"queued": "🕒", "running": "⏳", "done": "✅", "error": "❌"}[job.status]
+        st.caption(f"{icon} {job.label} · {job.elapsed:.0f}s")
+    # A job finished since the last poll: rerun the page so its tab shows the result
+    finished = {job.id for job in jobs if job.done}
+    if finished - st.session_state.jobs_seen:
+        st.session_state.jobs_seen |= finished
+        st.rerun()
+
+# ==========================================
+# 7. DASHBOARD UI
+# ==========================================
+# Each panel is a fragment: a widget inside one reruns only that panel, so
+# typing a query, toggling the HUD or selecting a row doesn't re-render the
+# rest of the page. Derived views are memoized per data version, and the table
+# is paged, so an interaction costs the same at 50 rows or 5,000.
+PAGE_SIZE = 100
+TABLE_COLUMNS = ['Thumbnail', 'Title', 'Views', 'Dup Group', 'Duration', 'Virality Score', 'Link', 'Video ID']
+
+def set_market_df(df):
+    st.session_state.df = df
+    st.session_state.data_version += 1
+
+def memo(name, fn, *key):
+    # fn() kept in session state until the data version (or `key`) changes
+    key = (st.session_state.data_version, *key)
+    hit = st.session_state.memo.get(name)
+    if hit is None or hit[0] != key:
+        hit = st.session_state.memo[name] = (key, fn())
+    return hit[1]
+
+def hud_metrics(df, exclude_dupes):
+    hud = df[~df['Is Reupload']] if exclude_dupes else df
+    return hud['Views'].sum(), hud['Earnings'].sum(), hud['Duration'].mean(), hud['Virality Score'].max()
+
 st.title("YouTube GEN AXE")
 
+# Messages raised in the search fragment, shown after the full rerun it triggers
+for kind, message in st.session_state.notices:
+    getattr(st, kind)(message)
+st.session_state.notices = []
+
 # 1. Search Bar (NameError Fix)
-c1, c2 = st.columns([4, 1])
-with c1:
-    query = st.text_input("Enter Topic, Niche, or Channel", placeholder="e.g. 'MrBeast', 'AI News'", label_visibility="collapsed")
-with c2:
-    if st.button("Analyze Market", type="primary", use_container_width=True):
-        if api_key and query:
-            with st.spinner('🛰️ Analyzing market data...'):
-                try:
-                    st.session_state.df, st.session_state.all_tags = get_market_data(api_key, query, 50)
-                    st.session_state.search_done = True
-                    st.session_state.selected_video_id = None
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
-        else:
-            st.error("❌ Keys or Query Missing")
+def use_suggestion(text):
+    st.session_state.query_input = text
 
-# 4. RESULTS AREA
-if st.session_state.search_done:
+@st.fragment
+def search_bar():
+    c1, c2 = st.columns([4, 1])
+    with c1:
+        query = st.text_input("Enter Topic, Niche, or Channel", placeholder="e.g. 'MrBeast', 'AI News'", label_visibility="collapsed", key="query_input")
+        search_mode = st.radio("Mode", ["🔎 Market Search", "📺 Channel Catalog", "🛰️ Deep Crawl"], horizontal=True, label_visibility="collapsed",
+                               help="Channel Catalog pages through the channel's uploads playlist (@handle, channel ID or URL): its whole back catalog for a few quota units. "
+                                    "Deep Crawl splits the query into date windows searched in parallel to get past the ~500-result search ceiling (uses the sidebar quota budget).")
+        # Past queries & tags matching what's typed; ⚡ = results already cached (instant, no quota)
+        suggestions = [(text, cached and search_signature(search_mode, text) in get_cached_searches())
+                       for text, _, cached in get_query_index().suggest(query, k=5) if normalize_query(text) != normalize_query(query)] if query else []
+        if suggestions:
+            for col, (text, cached) in zip(st.columns(len(suggestions)), suggestions):
+                col.button(f"⚡ {text}" if cached else text, key=f"suggest_{normalize_query(text)}", on_click=use_suggestion, args=(text,), use_container_width=True,
+                           help="Cached: instant, costs no quota" if cached else "Searched or tagged before")
+    with c2:
+        if st.button("Analyze Market", key="analyze_btn", type="primary", use_container_width=True):
+            if api_key and query:
+                with st.spinner('🛰️ Analyzing market data...'):
+                    try:
+                        if search_mode == "📺 Channel Catalog":
+                            df, st.session_state.all_tags, channel_title = get_channel_data(api_key, query, channel_limit)
+                            st.session_state.notices.append(("toast", f"📺 Ingested {len(df):,} videos from {channel_title}"))
+                        elif search_mode == "🛰️ Deep Crawl":
+                            df, st.session_state.all_tags = get_market_data(api_key, query, country_code, 50, crawl_days=crawl_days, quota_budget=crawl_budget)
+                            report = df.attrs.get('crawl', {})
+                            st.session_state.notices.append(("toast", f"🛰️ {len(df):,} unique videos from {report.get('pages', 0)} pages in {report.get('windows', 0)} windows ({report.get('units', 0):,} units)"))
+                            if report.get('budget_exhausted'):
+                                st.session_state.notices.append(("warning", "Crawl stopped at the quota budget. Raise it in the sidebar for fuller coverage."))
+                        else:
+                            df, st.session_state.all_tags = get_market_data(api_key, query, country_code, 50)
+                        df = price_earnings(df)
+                        st.session_state.query, st.session_state.region = query, country_code
+                        get_virality_scorer().observe([virality_scope(b, country_code, query) for b in ("All data", "Region", "Niche")], df)
+                        set_market_df(score_virality(df, virality_baseline))
+                        get_similarity_index().add_frame(df)
+                        get_market_history().record(df, query, country_code)
+                        remember_query(query, st.session_state.all_tags, search_signature(search_mode, query))
+                        st.session_state.search_done = True
+                        st.session_state.selected_video_id = None
+                    except Exception as e:
+                        st.error(f"An error occurred: {e}")
+                    else:
+                        # New data: redraw every panel
+                        st.rerun()
+            else:
+                st.error("❌ Keys or Query Missing")
+
+# 2. HUD METRICS (with Red/Orange CSS)
+@st.fragment
+def hud_panel():
     df = st.session_state.df
-    st.write("") 
-    
-    # --- HUD METRICS (with Red/Orange CSS) ---
+    reuploads = memo('reuploads', lambda: int(df['Is Reupload'].sum()))
+    exclude_dupes = st.toggle(f"Exclude near-duplicate thumbnails from HUD ({reuploads} reuploads found)", value=False, disabled=not reuploads)
+    views, earnings, duration, top_virality = memo('hud', lambda: hud_metrics(df, exclude_dupes), exclude_dupes)
     m1, m2, m3, m4 = st.columns(4)
-    with m1: st.markdown(f"<div class='metric-card'><div class='stat-label'>Total Views</div><div class='stat-value-red'>{df['Views'].sum():,}</div></div>", unsafe_allow_html=True)
-    with m2: st.markdown(f"<div class='metric-card'><div class='stat-label'>Est. Market Value</div><div class='stat-value-orange'>${df['Earnings'].sum():,.0f}</div></div>", unsafe_allow_html=True)
-    with m3: st.markdown(f"<div class='metric-card'><div class='stat-label'>Avg Duration</div><div class='stat-value-red'>{df['Duration'].mean():.1f}m</div></div>", unsafe_allow_html=True)
-    with m4: st.markdown(f"<div class='metric-card'><div class='stat-label'>Top Virality</div><div class='stat-value-orange'>{df['Virality Score'].max():.1f} / 10</div></div>", unsafe_allow_html=True)
+    with m1: st.markdown(f"<div class='metric-card'><div class='stat-label'>Total Views</div><div class='stat-value-red'>{views:,}</div></div>", unsafe_allow_html=True)
+    with m2: st.markdown(f"<div class='metric-card'><div class='stat-label'>Est. Market Value</div><div class='stat-value-orange'>${earnings:,.0f}</div></div>", unsafe_allow_html=True)
+    with m3: st.markdown(f"<div class='metric-card'><div class='stat-label'>Avg Duration</div><div class='stat-value-red'>{duration:.1f}m</div></div>", unsafe_allow_html=True)
+    with m4: st.markdown(f"<div class='metric-card'><div class='stat-label'>Top Virality</div><div class='stat-value-orange'>{top_virality:.1f} / 10</div></div>", unsafe_allow_html=True)
 
-    st.write("")
-    
-    # --- MAIN TABLE (Click-to-Select) ---
+# 3. MAIN TABLE (Click-to-Select, paged)
+@st.fragment
+def market_database():
+    df = st.session_state.df
     st.markdown("### Market Database")
-    st.caption("Click any video row to select it for analysis.")
-    
+    pages = (len(df) - 1) // PAGE_SIZE + 1
+    c1, c2 = st.columns([4, 1])
+    c1.caption("Click any video row to select it for analysis.")
+    page = c2.number_input("Page", min_value=1, max_value=pages, value=1, label_visibility="collapsed") if pages > 1 else 1
+    columns = TABLE_COLUMNS + [column for column in BATCH_COLUMNS if column in df]
+    view = memo('table_page', lambda: df.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE][columns], page)
+
     event = st.dataframe(
-        df[['Thumbnail', 'Title', 'Views', 'Duration', 'Virality Score', 'Link', 'Video ID']], 
+        view,
         column_config={
             "Thumbnail": st.column_config.ImageColumn("Preview"), 
             "Virality Score": st.column_config.ProgressColumn("Score ( / 10)", min_value=0, max_value=10),
             "Link": st.column_config.LinkColumn("▶️ WATCH"), 
-            "Video ID": None
+            "Dup Group": st.column_config.TextColumn("Near-Dup", help="Rows sharing a group have near-identical thumbnails (reuploads, compilations)"),
+            "Video ID": None,
+            **{column: st.column_config.TextColumn(column, width="medium") for column in BATCH_COLUMNS}
         }, 
         use_container_width=True, 
         height=500,
         hide_index=True,
         on_select="rerun", 
-        selection_mode="single-row"
+        selection_mode="single-row",
+        # New data or another page starts with a clean selection
+        key=f"market_table_{st.session_state.data_version}_{page}"
     )
     
     if event.selection.rows:
         selected_index = event.selection.rows[0]
-        st.session_state.selected_video_id = df.iloc[selected_index]['Video ID']
+        st.session_state.selected_video_id = view.iloc[selected_index]['Video ID']
 
     st.divider()
+    creator_studio()
 
-    # --- ADVANCED TOOLS (Show if a video is selected) ---
-    if st.session_state.selected_video_id:
-        video_id = st.session_state.selected_video_id
-        try:
-            row = df[df['Video ID'] == video_id].iloc[0]
-        except IndexError:
-             st.session_state.selected_video_id = None
-             st.stop()
-        
-        st.markdown(f"### Creator Studio: *{row['Title']}*")
-        
-        # --- FEATURE TABS ---
-        tabs = st.tabs(["✂️ AI Editing Lab", "🎨 AI Thumbnail Auditor", "✍️ AI Title Generator", "🎬 Video Player"])
+# 4. ADVANCED TOOLS (Show if a video is selected)
+@st.fragment
+def creator_studio():
+    df = st.session_state.df
+    video_id = st.session_state.selected_video_id
+    position = memo('row_index', lambda: {vid: i for i, vid in enumerate(df['Video ID'])}).get(video_id)
+    if position is None:
+        st.session_state.selected_video_id = None
+        st.info("Select a video from the database to load advanced tools.")
+        return
+    row = df.iloc[position]
+    
+    st.markdown(f"### Creator Studio: *{row['Title']}*")
+    
+    # --- FEATURE TABS ---
+    tabs = st.tabs(["✂️ AI Editing Lab", "🎨 AI Thumbnail Auditor", "✍️ AI Title Generator", "🎬 Video Player", "🧭 Similar Videos"])
 
-        # TAB 1: EDITING LAB
-        with tabs[0]:
-            if st.button("Run Forensic Editing Autopsy", key="edit_btn", type="primary", use_container_width=True):
-                if ai_enabled:
-                    open_forensic_lab(row['Video ID'], row['Title'], row['Duration'], row['Tags'])
-                else:
-                    st.warning("AI Module Offline")
-            st.info("Analyzes script pacing, estimates cut density, and recommends editing software.")
-
-        # TAB 2: THUMBNAIL AUDITOR (NEW!)
-        with tabs[1]:
-            c1, c2 = st.columns([1, 1])
-            with c1:
-                st.image(row['Thumbnail'], use_container_width=True, caption="Target Thumbnail")
-            with c2:
-                if st.button("Run Thumbnail Vision Audit", key="thumb_btn", type="primary", use_container_width=True):
-                    if ai_enabled:
-                        with st.spinner("👁️ AI is analyzing image..."):
-                            try:
-                                audit = ai_thumbnail_auditor(row['Thumbnail'])
-                                st.markdown(audit)
-                            except Exception as e:
-                                st.error(f"Vision API Error: {e}")
-                    else:
-                        st.warning("AI Module Offline")
-                st.info("Uses Gemini Vision to score the thumbnail on color, emotion, and text readability.")
-        
-        # TAB 3: TITLE GENERATOR (NEW!)
-        with tabs[2]:
-            if st.button("Generate 5 Viral Titles", key="title_btn", type="primary", use_container_width=True):
+    # TAB 1: EDITING LAB
+    with tabs[0]:
+        if st.button("Run Forensic Editing Autopsy", key="edit_btn", type="primary", use_container_width=True):
+            if ai_enabled:
+                submit_job(f"edit:{video_id}", f"Editing Autopsy: {row['Title'][:40]}", run_forensic_audit, row['Video ID'], row['Title'], row['Duration'], row['Tags'])
+            else:
+                st.warning("AI Module Offline")
+        analysis = show_job(f"edit:{video_id}")
+        if analysis and st.button("📄 Open Editing Report", key="edit_report_btn", use_container_width=True):
+            open_forensic_lab(row['Title'], analysis)
+        st.info("Analyzes script pacing, estimates cut density, and recommends editing software.")
+
+    # TAB 2: THUMBNAIL AUDITOR (NEW!)
+    with tabs[1]:
+        c1, c2 = st.columns([1, 1])
+        with c1:
+            st.image(row['Thumbnail'], use_container_width=True, caption="Target Thumbnail")
+        with c2:
+            if st.button("Run Thumbnail Vision Audit", key="thumb_btn", type="primary", use_container_width=True):
                 if ai_enabled:
-                    transcript = get_transcript_text(row['Video ID']) or f"Title: {row['Title']}"
-                    with st.spinner("✍️ AI is writing titles..."):
-                        titles = ai_title_generator(transcript, row['Title'])
-                        st.markdown(titles)
+                    submit_job(f"thumb:{video_id}", f"Thumbnail Audit: {row['Title'][:40]}", ai_thumbnail_auditor, row['Thumbnail'])
                 else:
                     st.warning("AI Module Offline")
-            st.info("Generates 5 new, high-CTR titles based on the video's content.")
+            audit = show_job(f"thumb:{video_id}", "Vision API Error")
+            if audit:
+                st.markdown(audit)
+            st.info("Uses Gemini Vision to score the thumbnail on color, emotion, and text readability.")
+    
+    # TAB 3: TITLE GENERATOR (NEW!)
+    with tabs[2]:
+        if st.button("Generate 5 Viral Titles", key="title_btn", type="primary", use_container_width=True):
+            if ai_enabled:
+                submit_job(f"title:{video_id}", f"Viral Titles: {row['Title'][:40]}", run_title_generator, row['Video ID'], row['Title'])
+            else:
+                st.warning("AI Module Offline")
+        titles = show_job(f"title:{video_id}")
+        if titles:
+            st.markdown(titles)
+        st.info("Generates 5 new, high-CTR titles based on the video's content.")
+
+    # TAB 4: VIDEO PLAYER
+    with tabs[3]:
+        st.video(row['Link'])
+
+    # TAB 5: SIMILAR VIDEOS (LOCAL INDEX, NO NETWORK)
+    with tabs[4]:
+        index = get_similarity_index()
+        if row['Video ID'] not in index.rows:
+            index.add_frame(df)
+        matches = index.query(video_id=row['Video ID'], k=10)
+        if matches:
+            similar_df = pd.DataFrame([{
+                'Thumbnail': meta.get('Thumbnail'),
+                'Title': meta['Title'],
+                'Similarity': round(score, 3),
+                'Link': f"https://www.youtube.com/watch?v={vid}"
+            } for vid, score, meta in matches])
+            st.dataframe(
+                similar_df,
+                column_config={
+                    "Thumbnail": st.column_config.ImageColumn("Preview"),
+                    "Similarity": st.column_config.ProgressColumn("Similarity", min_value=0, max_value=1),
+                    "Link": st.column_config.LinkColumn("▶️ WATCH")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("Not enough videos indexed yet. Run a few more searches.")
+        st.caption(f"Matched against {len(index):,} locally indexed videos (titles, tags & transcripts).")
+
+# 5. AI BATCH (several tools over the top rows, concurrently)
+BATCH_TOOLS = {  # label -> (result column, row -> (fn, args))
+    "✂️ Editing Audit": ('AI Editing Audit', lambda row: (run_forensic_audit, (row['Video ID'], row['Title'], row['Duration'], row['Tags']))),
+    "✍️ Viral Titles": ('AI Titles', lambda row: (run_title_generator, (row['Video ID'], row['Title']))),
+    "🎨 Thumbnail Audit": ('AI Thumbnail Audit', lambda row: (ai_thumbnail_auditor, (row['Thumbnail'],))),
+}
+BATCH_COLUMNS = [column for column, _ in BATCH_TOOLS.values()]
+
+def show_batch_summary(batch):
+    summary = batch.summary()
+    if summary:
+        st.dataframe(pd.DataFrame(summary), hide_index=True, use_container_width=True)
+        st.caption(f"Estimated cost: ${sum(r['Est. $'] for r in summary):.4f} · "
+                   f"{sum(r['Cached'] for r in summary)} of {sum(r['Calls'] for r in summary)} model calls served from cache")
+    for (video_id, tool), error in list(batch.errors.items())[:5]:
+        st.error(f"{tool} failed for {video_id}: {error}")
+
+def merge_batch_results(batch):
+    df = st.session_state.df.copy()
+    for tool, results in batch.columns().items():
+        column = BATCH_TOOLS[tool][0]
+        mapped = df['Video ID'].map(results)
+        df[column] = mapped.where(mapped.notna(), df[column]) if column in df else mapped
+    set_market_df(df)
+
+@st.fragment(run_every="2s")
+def batch_progress():
+    batch = st.session_state.batch
+    st.progress(batch.completed / batch.total, text=f"{batch.completed}/{batch.total} tasks · {len(batch.errors)} failed · {batch.elapsed:.0f}s")
+    show_batch_summary(batch)
+    if batch.done:
+        # Write the results into the table's AI columns and redraw every panel
+        merge_batch_results(batch)
+        st.session_state.batch_merged = True
+        st.rerun()
 
-        # TAB 4: VIDEO PLAYER
-        with tabs[3]:
-            st.video(row['Link'])
+@st.fragment
+def ai_batch_panel():
+    df = st.session_state.df
+    tools = st.multiselect("Tools", list(BATCH_TOOLS), default=list(BATCH_TOOLS))
+    c1, c2 = st.columns(2)
+    top_n = c1.number_input("Top videos", min_value=1, max_value=min(50, len(df)), value=min(20, len(df)))
+    rank_by = c2.radio("Ranked by", ["Virality Score", "Views"], horizontal=True)
+    batch = st.session_state.batch
+    running = batch is not None and not st.session_state.batch_merged
+    st.caption(f"{int(top_n) * len(tools)} AI tasks, run concurrently within each model's rate limit. Cached transcripts and responses are reused.")
+    if st.button("Run AI Batch", key="batch_btn", type="primary", use_container_width=True, disabled=running or not tools):
+        if ai_enabled:
+            rows = df.nlargest(int(top_n), rank_by)
+            tasks = [(row['Video ID'], tool, *BATCH_TOOLS[tool][1](row)) for _, row in rows.iterrows() for tool in tools]
+            batch = st.session_state.batch = AIBatch(tasks, get_model_router())
+            st.session_state.batch_merged = False
+            submit_job("batch", f"AI Batch: {len(tasks)} tasks", batch.run, coordinator=True)
+            running = True
+        else:
+            st.warning("AI Module Offline")
+    if running:
+        batch_progress()
+    elif batch is not None:
+        st.success(f"✅ Last batch: {len(batch.results)}/{batch.total} tasks in {batch.elapsed:.0f}s. Results are in the table's AI columns.")
+        show_batch_summary(batch)
+
+# 6. ANALYTICS (charts drawn from pre-aggregated bins, figures cached per data version)
+@st.cache_resource
+def get_history_bins():
+    # Binned incrementally: each refresh only reads history rows appended since the last one
+    return HistoryBins()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def history_charts(version):
+    return render_charts(get_history_bins().snapshot())
+
+def results_charts(df):
+    bins = MarketBins()
+    bins.add(df)
+    return render_charts(bins.snapshot()), len(bins)
+
+@st.fragment
+def analytics_panel():
+    sources = (["Current results"] if st.session_state.search_done else []) + ["Stored history"]
+    source = st.radio("Data", sources, horizontal=True)
+    if source == "Stored history":
+        bins = get_history_bins()
+        charts, videos = history_charts(bins.refresh(get_market_history())), len(bins)
     else:
-        st.info("Select a video from the database to load advanced tools.")
+        charts, videos = memo('analytics', lambda: results_charts(st.session_state.df))
+    if not videos:
+        st.info("No data yet. Run a search first.")
+        return
+    st.caption(f"{videos:,} videos binned.")
+    for tab, (title, png) in zip(st.tabs(list(charts)), charts.items()):
+        tab.image(png, use_container_width=True)
+
+# 7. EXPORT (current results or stored history, streamed to disk in chunks)
+EXPORT_DEFAULT_COLUMNS = ['Video ID', 'Title', 'Views', 'Likes', 'Comments', 'Engagement', 'Duration', 'Virality Score', 'Published', 'Link']
+
+@st.fragment
+def export_panel():
+    history = get_market_history()
+    sources = (["Current results"] if st.session_state.search_done else []) + ["Stored history"]
+    c1, c2 = st.columns(2)
+    source = c1.radio("Source", sources, horizontal=True)
+    fmt = c2.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+    columns = st.multiselect("Columns", list(HISTORY_COLUMNS), default=EXPORT_DEFAULT_COLUMNS)
+    c1, c2, c3 = st.columns(3)
+    filters = {
+        'min_views': c1.number_input("Min views", min_value=0, value=0, step=1000),
+        'published_since': c2.date_input("Published since", value=None),
+    }
+    if source == "Stored history":
+        chosen = c3.selectbox("Query", ["All queries"] + history.queries())
+        filters['query'] = None if chosen == "All queries" else chosen
+        filters['latest_only'] = c3.checkbox("Latest snapshot per video", value=True)
+        st.caption(f"{history.count(**filters):,} stored rows match.")
+
+    if st.button("Prepare Export", key="export_btn", use_container_width=True, disabled=not columns):
+        ext, _ = EXPORT_FORMATS[fmt]
+        if source == "Stored history":
+            chunks = history.chunks(columns, **filters)
+        else:
+            chunks = frame_chunks(st.session_state.df, columns, **filters)
+        previous = st.session_state.export
+        fd, path = tempfile.mkstemp(prefix="gen_axe_", suffix=f".{ext}")
+        os.close(fd)
+        try:
+            rows, size = write_export(chunks, fmt, path)
+        except Exception as e:
+            os.remove(path)
+            st.error(f"Export failed: {e}")
+        else:
+            if previous and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            if rows:
+                st.session_state.export = {'path': path, 'format': fmt, 'rows': rows, 'size': size}
+            else:
+                # Nothing to download: an empty CSV has no header and an empty Parquet file isn't readable
+                os.remove(path)
+                st.session_state.export = None
+                st.info("No rows match these filters, so there is nothing to export.")
+
+    export = st.session_state.export
+    if export and os.path.exists(export['path']):
+        ext, mime = EXPORT_FORMATS[export['format']]
+        st.caption(f"{export['rows']:,} rows · {export['size'] / 2**20:.1f} MB {export['format']}")
+        with open(export['path'], "rb") as f:
+            st.download_button(f"⬇️ Download {export['format']}", f, file_name=f"gen_axe_export.{ext}", mime=mime, use_container_width=True)
+
+# 8. QUERY COMPARISON (latest stored fetch of each query, split by video ID)
+COMPARE_COLUMNS = ['Video ID', 'Thumbnail', 'Title', 'Views', 'Engagement', 'Virality Score', 'Link']
+
+def query_results(query):
+    chunks = list(get_market_history().chunks(COMPARE_COLUMNS, query=query, latest_fetch=True))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COMPARE_COLUMNS)
+
+@st.fragment
+def compare_panel():
+    queries = get_market_history().queries()
+    if len(queries) < 2:
+        st.info("Search at least two queries to compare them.")
+        return
+    c1, c2 = st.columns(2)
+    query_a = c1.selectbox("Query A", queries, index=queries.index(st.session_state.query) if st.session_state.query in queries else 0)
+    query_b = c2.selectbox("Query B", [q for q in queries if q != query_a])
+    parts = compare_results(query_results(query_a), query_results(query_b))
+    st.caption(f"{len(parts['Both'])} shared videos, {jaccard(parts):.0%} overlap (shared / all distinct videos), from the latest stored fetch of each query.")
+    st.dataframe(summarize_diff(parts), hide_index=True, use_container_width=True)
+    labels = {'Only A': f"Only in '{query_a}'", 'Both': "In both (by engagement)", 'Only B': f"Only in '{query_b}'"}
+    for col, (name, part) in zip(st.columns(3), parts.items()):
+        col.markdown(f"**{labels[name]}** · {len(part)}")
+        shown = ['Thumbnail', 'Title', 'Views', 'Engagement'] + [c for c in ('Rank', 'Rank A', 'Rank B') if c in part] + ['Link']
+        col.dataframe(
+            part[shown],
+            column_config={
+                "Thumbnail": st.column_config.ImageColumn("Preview", width="small"),
+                "Views": st.column_config.NumberColumn("Views", format="%d"),
+                "Engagement": st.column_config.NumberColumn("Eng. %", format="%.2f"),
+                "Link": st.column_config.LinkColumn("Link", display_text="▶"),
+            },
+            use_container_width=True,
+            hide_index=True,
+            height=360
+        )
+
+search_bar()
+
+# RESULTS AREA
+if st.session_state.search_done:
+    if 'Brightness' not in st.session_state.df:
+        # One batched, local pass over every thumbnail in the result set
+        with st.spinner('🎨 Scanning thumbnails...'):
+            set_market_df(mark_near_duplicates(get_thumbnail_extractor().add_columns(st.session_state.df)))
+    if st.session_state.rpm != rpm:
+        set_market_df(price_earnings(st.session_state.df.copy()))
+    if st.session_state.virality_scope != virality_scope(virality_baseline, st.session_state.region, st.session_state.query):
+        set_market_df(score_virality(st.session_state.df.copy(), virality_baseline))
+    df = st.session_state.df
+    st.write("") 
+    hud_panel()
+    st.write("")
+
+    # --- THUMBNAIL MARKET SCAN (local features, sortable, no AI cost; full reruns only) ---
+    with st.expander("🎨 Thumbnail Market Scan"):
+        st.caption("Brightness, contrast, colorfulness, edge density and text coverage for every thumbnail. Click a header to sort.")
+        st.dataframe(
+            memo('thumb_scan', lambda: df[['Thumbnail', 'Title'] + FEATURE_COLUMNS + ['Views']]),
+            column_config={
+                "Thumbnail": st.column_config.ImageColumn("Preview"),
+                "Brightness": st.column_config.ProgressColumn("Brightness", min_value=0, max_value=100, format="%.0f"),
+                "Contrast": st.column_config.ProgressColumn("Contrast", min_value=0, max_value=100, format="%.0f"),
+                "Edge Density": st.column_config.NumberColumn("Edge Density", format="%.1f%%"),
+                "Text Area %": st.column_config.NumberColumn("Text Area", format="%.1f%%")
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+
+    market_database()
+
+    with st.expander("🤖 AI Batch: audit the top videos in one go"):
+        ai_batch_panel()
+
+st.divider()
+with st.expander("📈 Market Analytics"):
+    analytics_panel()
+with st.expander("🔀 Compare Queries"):
+    compare_panel()
+with st.expander("📦 Export Data"):
+    export_panel()
+
+# Which model each tier is using right now, with rolling latency & error rate
+if ai_enabled:
+    with st.sidebar.expander("🧠 Model Router"):
+        st.dataframe(pd.DataFrame(get_model_router().snapshot()), hide_index=True, use_container_width=True)
+
+# Live status of this session's AI jobs (polls every 2s while any is pending, reruns the page when one finishes)
+if st.session_state.jobs:
+    pending = get_job_queue().pending(st.session_state.jobs.values())
+    with st.sidebar:
+        st.fragment(job_monitor, run_every="2s" if pending else None)()
@@ -0,0 +1,100 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+# ==========================================
+# QUERY AUTOCOMPLETE (PREFIX INDEX)
+# ==========================================
+# Past queries and collected tags in one sorted array, searched with bisect.
+# Every word start of a term is an entry ("ai news" is found by "ai" and by
+# "ne"), so a prefix lookup is two bisects plus a top-k over the matching
+# slice. One- and two-letter prefixes match too much of the array for that, so
+# they keep a small running top list instead. Queries outweigh tags, and
+# queries whose results are already in the market-data cache rank first:
+# picking one costs no quota and returns instantly. Lookups stay under a
+# couple of ms at hundreds of thousands of terms.
+
+QUERY_WEIGHT = 10.0  # one search counts as much as ten tag sightings
+SHORT_PREFIX = 2  # prefixes up to this length are answered from running top lists
+SHORT_TOP = 32
+
+
+def normalize(term):
+    return re.sub(r"\s+", " ", str(term).lower().replace("#", " ")).strip()
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []  # sorted (word-start suffix, term key)
+        self.terms = {}  # term key -> [display text, weight, cached]
+        self.short = defaultdict(list)  # short prefix -> best term keys
+        self.floor = {}  # short prefix -> lowest rank in its full top list
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _entries(self, key):
+        words = key.split(" ")
+        return [(" ".join(words[i:]), key) for i in range(len(words))]
+
+    def _rank(self, key):
+        _, weight, cached = self.terms[key]
+        return cached, weight
+
+    def _promote(self, key):
+        # Keep `key` in the short-prefix top lists it now qualifies for
+        rank = self._rank(key)
+        for suffix, _ in self._entries(key):
+            for n in range(SHORT_PREFIX + 1):
+                prefix = suffix[:n]
+                if prefix in self.floor and rank <= self.floor[prefix]:
+                    continue
+                best = self.short[prefix]
+                if key in best:
+                    continue
+                best.append(key)
+                if len(best) > SHORT_TOP:
+                    best.remove(min(best, key=self._rank))
+                if len(best) == SHORT_TOP:
+                    self.floor[prefix] = min(map(self._rank, best))
+
+    def add(self, term, weight=1.0, cached=False):
+        self.add_many([(term, weight)], cached)
+
+    def add_many(self, items, cached=False):
+        """Add (term, weight) pairs; weights accumulate across calls."""
+        with self.lock:
+            fresh = []
+            for term, weight in items:
+                key = normalize(term)
+                if not key:
+                    continue
+                entry = self.terms.get(key)
+                if entry is None:
+                    self.terms[key] = [str(term).strip(), weight, cached]
+                    fresh.extend(self._entries(key))
+                else:
+                    entry[1] += weight
+                    entry[2] = entry[2] or cached
+                self._promote(key)
+            if len(fresh) > 64:
+                self.entries = sorted(self.entries + fresh)
+            else:
+                for item in fresh:
+                    insort(self.entries, item)
+
+    def suggest(self, prefix, k=6):
+        """Top-k (text, weight, cached) for terms with a word starting with `prefix`."""
+        prefix = normalize(prefix)
+        with self.lock:
+            if len(prefix) <= SHORT_PREFIX:
+                keys = self.short.get(prefix, ())
+            else:
+                lo = bisect_left(self.entries, (prefix,))
+                hi = bisect_left(self.entries, (prefix + "\uffff",), lo)
+                keys = {key for _, key in self.entries[lo:hi]}
+            ranked = heapq.nlargest(k, keys, key=self._rank)
+            return [tuple(self.terms[key]) for key in ranked]
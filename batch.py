@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# AI BATCH (MANY TOOLS x MANY VIDEOS)
+# ==========================================
+# One batch is a list of (video_id, tool, fn, args) tasks fanned out over a
+# small thread pool. Concurrency is bounded here; the per-model request limits,
+# failover and response cache live in the model router, and transcripts come
+# from the app's transcript cache, so re-running a batch over the same rows is
+# mostly cache hits. The batch itself runs as one coordinator job (jobs.py); progress,
+# results and a usage/cost summary are read off this object while it runs.
+
+
+class AIBatch:
+    def __init__(self, tasks, router, workers=6):
+        self.tasks = tasks
+        self.router = router
+        self.workers = workers
+        self.results, self.errors, self.usage = {}, {}, []
+        self.completed = 0
+        self.started = self.finished = None
+        self.lock = threading.Lock()
+
+    @property
+    def total(self):
+        return len(self.tasks)
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - (self.started or time.time())
+
+    def run(self):
+        self.started = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-batch") as pool:
+                list(pool.map(self._run_task, self.tasks))
+        finally:
+            self.finished = time.time()
+        return self.summary()
+
+    def _run_task(self, task):
+        video_id, tool, fn, args = task
+        usage = []
+        try:
+            with self.router.tracking(usage):
+                result = fn(*args)
+            self.results[(video_id, tool)] = result
+        except Exception as e:
+            self.errors[(video_id, tool)] = str(e) or e.__class__.__name__
+        finally:
+            with self.lock:
+                self.usage.extend(usage)
+                self.completed += 1
+
+    def columns(self):
+        """{tool: {video_id: result}} for merging into the result set."""
+        out = defaultdict(dict)
+        for (video_id, tool), result in self.results.items():
+            out[tool][video_id] = result
+        return out
+
+    def summary(self):
+        """Per-model usage rows: calls, cache hits, estimated tokens and cost."""
+        rows = defaultdict(lambda: {'Calls': 0, 'Cached': 0, 'Tokens In': 0, 'Tokens Out': 0, 'Est. $': 0.0})
+        with self.lock:
+            usage = list(self.usage)
+        for record in usage:
+            row = rows[record['model']]
+            row['Calls'] += 1
+            row['Cached'] += record['cached']
+            row['Tokens In'] += record['tokens_in']
+            row['Tokens Out'] += record['tokens_out']
+            row['Est. $'] += record['cost']
+        return [{'Model': model, **row, 'Est. $': round(row['Est. $'], 4)} for model, row in sorted(rows.items())]
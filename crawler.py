@@ -0,0 +1,127 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+# ==========================================
+# TIME-SLICED SEARCH CRAWL
+# ==========================================
+# search().list stops at ~500 results per query, however many pages you ask
+# for. To cover a whole niche we split the date range into publishedAfter /
+# publishedBefore windows and search them in parallel. A window whose first
+# page reports more results than the cap is split in half (down to MIN_WINDOW)
+# before paging further, so quota goes to windows that can actually be
+# exhausted. Every attempt (retries included) is paced against a shared quota
+# budget: search_page charges it right before each request it sends, so the
+# budget is a hard cap on units spent, not on pages received.
+
+SEARCH_COST = 100  # quota units per search().list page
+RESULT_CAP = 500
+PAGE_SIZE = 50
+MIN_WINDOW = timedelta(hours=6)
+
+
+def rfc3339(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class QuotaPacer:
+    """Token bucket for request rate plus a hard quota-unit budget."""
+
+    def __init__(self, budget_units, rate_per_sec=5):
+        self.remaining = budget_units
+        self.interval = 1.0 / rate_per_sec
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, cost):
+        with self.lock:
+            if self.remaining < cost:
+                return False
+            self.remaining -= cost
+            now = time.monotonic()
+            wait_for = max(0.0, self.next_slot - now)
+            self.next_slot = max(now, self.next_slot) + self.interval
+        time.sleep(wait_for)
+        return True
+
+
+def crawl_search(search_page, start, end, budget_units=2000, initial_windows=8, workers=4):
+    """Collect unique video IDs for one query across [start, end).
+
+    `search_page(published_after, published_before, page_token, charge)` performs
+    one search().list call and returns the response dict. It must call `charge()`
+    before every request it sends (retries too, so don't hedge these); `charge`
+    raises QuotaExhausted once the budget is spent. Returns (video_ids, report).
+    """
+    pacer = QuotaPacer(budget_units)
+    seen, ordered = set(), []
+    report = {'pages': 0, 'windows': 0, 'splits': 0, 'failed': 0, 'units': 0, 'budget_exhausted': False}
+    lock = threading.Lock()
+
+    def collect(items):
+        with lock:
+            for item in items:
+                vid = item['id']['videoId']
+                if vid not in seen:
+                    seen.add(vid)
+                    ordered.append(vid)
+
+    def charge():
+        if not pacer.acquire(SEARCH_COST):
+            raise QuotaExhausted(pacer)
+        with lock:
+            report['units'] += SEARCH_COST
+
+    def run_window(lo, hi):
+        """Search one window; returns child windows if it had to be split."""
+        page_token, first = None, True
+        while True:
+            try:
+                resp = search_page(rfc3339(lo), rfc3339(hi), page_token, charge)
+            except QuotaExhausted as e:
+                if e.args[0] is not pacer:
+                    raise  # another crawl's budget, shared through a coalesced call: a failed window here
+                report['budget_exhausted'] = True
+                return []
+            with lock:
+                report['pages'] += 1
+            collect(resp.get('items', []))
+            total = resp.get('pageInfo', {}).get('totalResults', 0)
+            if first and total > RESULT_CAP and hi - lo > MIN_WINDOW * 2:
+                mid = lo + (hi - lo) / 2
+                with lock:
+                    report['splits'] += 1
+                return [(lo, mid), (mid, hi)]
+            first = False
+            page_token = resp.get('nextPageToken')
+            if not page_token:
+                return []
+
+    step = (end - start) / initial_windows
+    queue = [(start + step * i, start + step * (i + 1)) for i in range(initial_windows)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl") as pool:
+        running = set()
+        while queue or running:
+            while queue and not report['budget_exhausted']:
+                running.add(pool.submit(run_window, *queue.pop()))
+                report['windows'] += 1
+            queue.clear()
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    queue.extend(future.result())
+                except Exception:
+                    report['failed'] += 1  # keep what the other windows found
+    return ordered, report
+
+
+def crawl_range(days):
+    end = datetime.now(timezone.utc)
+    return end - timedelta(days=days), end
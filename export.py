@@ -0,0 +1,121 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from history import CHUNK_ROWS, COLUMNS
+
+# ==========================================
+# STREAMING EXPORT (CSV / JSONL / PARQUET)
+# ==========================================
+# Exports are a pipeline of generators: a source yields DataFrame chunks
+# (already projected and filtered, see history.py / frame_chunks), an encoder
+# turns each chunk into bytes, and write_export streams those bytes to disk.
+# Nothing ever holds the whole export at once, so a 100k-row harvest costs one
+# chunk of memory. Parquet writes one row group per chunk, with the schema
+# taken from the history column types rather than inferred from the first
+# chunk (a column that is all NULL there would otherwise be typed null).
+
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'JSONL': ('jsonl', 'application/x-ndjson'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+ARROW_TYPES = {'TEXT': pa.string(), 'INTEGER': pa.int64(), 'REAL': pa.float64()}
+
+
+def frame_chunks(df, columns=None, chunk_rows=CHUNK_ROWS, min_views=None, published_since=None):
+    """history.MarketHistory.chunks for an in-memory result set."""
+    mask = None
+    if min_views:
+        mask = df['Views'] >= int(min_views)
+    if published_since:
+        since = df['Published'] >= str(published_since)
+        mask = since if mask is None else mask & since
+    names = [c for c in (columns or df.columns) if c in df.columns]
+    rows = df.index if mask is None else df.index[mask.to_numpy()]
+    for start in range(0, len(rows), chunk_rows):
+        chunk = df.loc[rows[start:start + chunk_rows], names]
+        if 'Tags' in chunk:  # stored as JSON text in history; export them the same way
+            chunk = chunk.assign(Tags=[json.dumps(tags) if isinstance(tags, list) else tags for tags in chunk['Tags']])
+        yield chunk
+
+
+def _csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+def _jsonl(chunks):
+    for chunk in chunks:
+        yield chunk.to_json(orient='records', lines=True, force_ascii=False).rstrip("\n").encode() + b"\n"
+
+
+class _Drain:
+    """Write-only sink ParquetWriter can stream into; bytes are handed on per row group."""
+
+    def __init__(self):
+        self.parts, self.position, self.closed = [], 0, False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _schema(chunk):
+    inferred = pa.Table.from_pandas(chunk, preserve_index=False).schema
+    return pa.schema([(name, ARROW_TYPES[COLUMNS[name][1]] if name in COLUMNS else inferred.field(name).type)
+                      for name in chunk.columns])
+
+
+def _parquet(chunks):
+    sink, writer = _Drain(), None
+    for chunk in chunks:
+        if writer is None:
+            writer = pq.ParquetWriter(sink, _schema(chunk), compression="zstd")
+        writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+
+ENCODERS = {'CSV': _csv, 'JSONL': _jsonl, 'Parquet': _parquet}
+
+
+def encode(chunks, fmt):
+    """Generator of byte blocks for `chunks` in format `fmt` (a FORMATS key)."""
+    return ENCODERS[fmt](chunks)
+
+
+def write_export(chunks, fmt, path):
+    """Stream an export to `path`; returns (rows, bytes written)."""
+    rows = written = 0
+
+    def counted(chunks):
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    with open(path, "wb") as f:
+        for block in encode(counted(chunks), fmt):
+            f.write(block)
+            written += len(block)
+    return rows, written
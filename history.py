@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+# ==========================================
+# MARKET HISTORY (SQLITE)
+# ==========================================
+# Every fetched result set is appended here as one snapshot per video, so a
+# niche can be exported (or compared) long after the session that fetched it.
+# Reads stream out in fixed-size chunks straight from a cursor, with the
+# column list and filters turned into the SELECT / WHERE, so only the rows and
+# columns asked for ever leave SQLite.
+
+# Display name -> (SQL column, type)
+COLUMNS = {
+    'Video ID': ('video_id', 'TEXT'),
+    'Title': ('title', 'TEXT'),
+    'Views': ('views', 'INTEGER'),
+    'Likes': ('likes', 'INTEGER'),
+    'Comments': ('comments', 'INTEGER'),
+    'Engagement': ('engagement', 'REAL'),
+    'Earnings': ('earnings', 'REAL'),
+    'Duration': ('duration', 'REAL'),
+    'Virality Score': ('virality_score', 'REAL'),
+    'Published': ('published', 'TEXT'),
+    'Published At': ('published_at', 'TEXT'),
+    'Tags': ('tags', 'TEXT'),
+    'Link': ('link', 'TEXT'),
+    'Thumbnail': ('thumbnail', 'TEXT'),
+    'Query': ('query', 'TEXT'),
+    'Region': ('region', 'TEXT'),
+    'Fetched At': ('fetched_at', 'TEXT'),
+}
+CHUNK_ROWS = 5000
+
+
+class MarketHistory:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # WAL: an open read cursor (a long export, tag seeding) doesn't block record()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS market_rows ({', '.join(f'{col} {kind}' for col, kind in COLUMNS.values())})")
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(market_rows)")}
+        for col, kind in COLUMNS.values():
+            if col not in existing:  # stores created before the column existed
+                self.db.execute(f"ALTER TABLE market_rows ADD COLUMN {col} {kind}")
+        self.db.execute("CREATE INDEX IF NOT EXISTS market_rows_query ON market_rows (query, fetched_at)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS market_rows_video ON market_rows (video_id, fetched_at)")
+
+    def record(self, df, query, region):
+        """Append one snapshot row per video in df."""
+        if df.empty:
+            return
+        rows = df.reindex(columns=list(COLUMNS)).astype(object)
+        if 'Tags' in df:
+            rows['Tags'] = [json.dumps(tags) if isinstance(tags, list) else tags for tags in df['Tags']]
+        rows['Query'], rows['Region'], rows['Fetched At'] = query, region, time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows = rows.where(rows.notna(), None).itertuples(index=False, name=None)
+        with self.lock:
+            self.db.executemany(f"INSERT INTO market_rows ({', '.join(col for col, _ in COLUMNS.values())}) VALUES ({','.join('?' * len(COLUMNS))})", rows)
+            self.db.commit()
+
+    def queries(self):
+        with self.lock:
+            return [r[0] for r in self.db.execute("SELECT DISTINCT query FROM market_rows ORDER BY query")]
+
+    def query_counts(self):
+        """(query, times fetched) for every stored query."""
+        with self.lock:
+            return self.db.execute("SELECT query, COUNT(DISTINCT fetched_at) FROM market_rows GROUP BY query").fetchall()
+
+    def tag_counts(self):
+        """How many stored videos carry each tag (latest snapshot per video)."""
+        counts = Counter()
+        for chunk in self.chunks(['Tags'], latest_only=True):
+            for tags in chunk['Tags'].dropna():
+                counts.update(json.loads(tags))
+        return counts
+
+    def count(self, **filters):
+        where, params = _where(filters)
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM market_rows{where}", params).fetchone()[0]
+
+    def chunks(self, columns=None, chunk_rows=CHUNK_ROWS, **filters):
+        """Yield DataFrames of at most chunk_rows rows, projected and filtered in SQL.
+
+        Filters: query, region, min_views, published_since (YYYY-MM-DD),
+        latest_only (keep each video's most recent snapshot among the rows
+        the other filters match), latest_fetch (with query: only
+        the rows of that query's most recent fetch, in result order).
+        """
+        names = [name for name in (columns or COLUMNS) if name in COLUMNS]
+        where, params = _where(filters)
+        sql = f"SELECT {', '.join(COLUMNS[name][0] for name in names)} FROM market_rows{where} ORDER BY rowid"
+        # Own connection: a long export must not hold self.lock (and in WAL mode, no SQLite lock writers need)
+        db = sqlite3.connect(self.path)
+        try:
+            cursor = db.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=names)
+        finally:
+            db.close()
+
+    def rows_after(self, rowid, columns, chunk_rows=CHUNK_ROWS):
+        """Yield (last rowid, DataFrame) chunks of the rows appended after `rowid`."""
+        sql = f"SELECT rowid, {', '.join(COLUMNS[name][0] for name in columns)} FROM market_rows WHERE rowid > ? ORDER BY rowid"
+        db = sqlite3.connect(self.path)
+        try:
+            cursor = db.execute(sql, (rowid,))
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield rows[-1][0], pd.DataFrame.from_records([row[1:] for row in rows], columns=columns)
+        finally:
+            db.close()
+
+
+def _where(filters):
+    clauses, params = [], []
+    if filters.get('query'):
+        clauses.append("query = ?")
+        params.append(filters['query'])
+    if filters.get('region'):
+        clauses.append("region = ?")
+        params.append(filters['region'])
+    if filters.get('min_views'):
+        clauses.append("views >= ?")
+        params.append(int(filters['min_views']))
+    if filters.get('published_since'):
+        clauses.append("published >= ?")
+        params.append(str(filters['published_since']))
+    base, base_params = list(clauses), list(params)
+    if filters.get('latest_fetch') and filters.get('query'):
+        clauses.append("fetched_at = (SELECT MAX(fetched_at) FROM market_rows WHERE query = ?)")
+        params.append(filters['query'])
+    if filters.get('latest_only'):
+        # Latest snapshot among the rows the other filters keep, not the video's latest overall
+        inner = " WHERE " + " AND ".join(base) if base else ""
+        clauses.append(f"rowid IN (SELECT MAX(rowid) FROM market_rows{inner} GROUP BY video_id)")
+        params.extend(base_params)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
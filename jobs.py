@@ -0,0 +1,77 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# BACKGROUND JOB QUEUE (AI TASKS)
+# ==========================================
+# Model calls run on a worker pool instead of the Streamlit script thread.
+# submit() returns a job ID right away; the Job object keeps the status and
+# result, so a rerun (or a different tab) can pick it up later by ID.
+# Coordinator jobs (an AI batch, which fans its tasks out over its own pool
+# and mostly waits) run on a separate pool, so a few long batches can never
+# occupy the workers other users' single audits are queued for.
+
+PENDING = ("queued", "running")
+
+
+class Job:
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status not in PENDING
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - (self.started or self.submitted)
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, coordinator_workers=8, keep=500):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-job")
+        self.coordinators = ThreadPoolExecutor(max_workers=coordinator_workers, thread_name_prefix="ai-coordinator")
+        self.jobs = {}
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+
+    def submit(self, label, fn, *args, coordinator=False, **kwargs):
+        with self.lock:
+            job = Job(f"job-{next(self.counter)}", label)
+            self.jobs[job.id] = job
+            self._evict()
+        (self.coordinators if coordinator else self.executor).submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        job.status, job.started = "running", time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e) or e.__class__.__name__
+            job.status = "error"
+        finally:
+            job.finished = time.time()
+
+    def _evict(self):
+        # Drop the oldest finished jobs once we hold more than `keep`
+        finished = [j for j in self.jobs.values() if j.done]
+        for job in finished[:max(0, len(self.jobs) - self.keep)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def pending(self, job_ids):
+        return [j for j in map(self.get, job_ids) if j is not None and not j.done]
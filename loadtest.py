@@ -0,0 +1,331 @@
+import argparse
+import hashlib
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+
+# ==========================================
+# MULTI-SESSION LOAD HARNESS (STUB BACKENDS)
+# ==========================================
+# Drives N simulated users through search -> row select -> AI tool against
+# app.py or app2.py with Streamlit's AppTest, all in one process, so
+# st.cache_data / st.cache_resource, the job pool and the resilience layer are
+# shared the way they are on a real server. YouTube, transcripts, thumbnails
+# and the model are replaced by in-process stubs with configurable latency,
+# so nothing touches the network and no quota is spent.
+#
+#   python loadtest.py --app app.py --sessions 16 --iterations 3 --queries 4
+#
+# Reports throughput, latency per interaction (p50 / p95 / max), time until an
+# AI result shows up, peak RSS per session and backend cache hit rates.
+
+SECRETS = {'YOUTUBE_API_KEY': 'load-test', 'GOOGLE_API_KEY': 'load-test', 'GCP_PROJECT_ID': 'load-test', 'GCP_LOCATION': 'us-central1'}
+QUERIES = ["ai news", "minecraft", "street food", "budget travel", "home workout", "crypto", "lofi beats", "car review"]
+
+
+class StubBackends:
+    """Fake YouTube / transcript / thumbnail / model services that count every call."""
+
+    def __init__(self, youtube_latency, transcript_latency, thumbnail_latency, model_latency, jitter=0.3):
+        self.latency = {'youtube': youtube_latency, 'transcript': transcript_latency,
+                        'thumbnail': thumbnail_latency, 'model': model_latency}
+        self.jitter = jitter
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def _hit(self, backend):
+        with self.lock:
+            self.calls[backend] += 1
+        base = self.latency[backend]
+        if base:
+            time.sleep(base * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def install(self):
+        import googleapiclient.discovery
+        import google.generativeai as genai
+        import requests
+        from youtube_transcript_api import YouTubeTranscriptApi
+
+        stubs = self
+
+        class Request:
+            def __init__(self, kind, fn):
+                self.kind, self.fn = kind, fn
+
+            def execute(self, http=None, num_retries=0):
+                stubs._hit('youtube')
+                with stubs.lock:
+                    stubs.calls[f'youtube.{self.kind}'] += 1
+                return self.fn()
+
+        def search_list(q="", maxResults=50, pageToken=None, **kwargs):
+            prefix = hashlib.md5(q.encode()).hexdigest()[:6]
+            return Request('search', lambda: {
+                'items': [{'id': {'videoId': f"{prefix}{i:05d}"}} for i in range(maxResults)],
+                'pageInfo': {'totalResults': maxResults},
+            })
+
+        def videos_list(id="", **kwargs):
+            def build_items():
+                with stubs.lock:
+                    stubs.calls['youtube.video_ids'] += len(id.split(","))
+                items = []
+                for vid in id.split(","):
+                    seed = int(hashlib.md5(vid.encode()).hexdigest()[:8], 16)
+                    views = 1000 + seed % 5_000_000
+                    items.append({
+                        'id': vid,
+                        'statistics': {'viewCount': str(views), 'likeCount': str(views // 40), 'commentCount': str(views // 900)},
+                        'snippet': {'title': f"Video {vid} about {vid[:3]}", 'tags': ['load', 'test', vid[:3]],
+                                    'publishedAt': '2024-01-01T00:00:00Z',
+                                    'thumbnails': {'high': {'url': f"https://i.ytimg.com/vi/{vid}/hqdefault.jpg"}}},
+                        'contentDetails': {'duration': f"PT{1 + seed % 40}M"},
+                    })
+                return {'items': items}
+            return Request('videos', build_items)
+
+        def build(*args, **kwargs):
+            return types.SimpleNamespace(
+                search=lambda: types.SimpleNamespace(list=search_list, list_next=lambda *a: None),
+                videos=lambda: types.SimpleNamespace(list=videos_list),
+            )
+
+        def fetch_transcript(api, video_id, **kwargs):
+            stubs._hit('transcript')
+            snippets = [{'text': f"um so today [Music] we look at {video_id} and why it works"}] * 40
+            return types.SimpleNamespace(to_raw_data=lambda: snippets)
+
+        from PIL import Image
+        thumbnails = {}
+
+        def http_get(url, **kwargs):
+            stubs._hit('thumbnail')
+            data = thumbnails.get(url)
+            if data is None:
+                seed = int(hashlib.md5(url.encode()).hexdigest()[:6], 16)
+                buf = BytesIO()
+                Image.new("RGB", (480, 360), (seed % 256, (seed >> 8) % 256, (seed >> 16) % 256)).save(buf, "JPEG")
+                data = thumbnails[url] = buf.getvalue()
+            return types.SimpleNamespace(content=data, status_code=200, raise_for_status=lambda: None)
+
+        class Model:
+            def __init__(self, model_name, **kwargs):
+                self.model_name = model_name
+
+            def generate_content(self, contents, **kwargs):
+                stubs._hit('model')
+                return types.SimpleNamespace(text=f"Report from {self.model_name}")
+
+        googleapiclient.discovery.build = build
+        YouTubeTranscriptApi.fetch = fetch_transcript
+        requests.get = http_get
+        genai.GenerativeModel = Model
+        genai.configure = lambda **kwargs: None
+        try:
+            import vertexai
+            import vertexai.generative_models
+            vertexai.init = lambda **kwargs: None
+            vertexai.generative_models.GenerativeModel = Model
+            vertexai.generative_models.Part = types.SimpleNamespace(from_data=lambda **kwargs: kwargs)
+        except ImportError:
+            pass  # only app2.py needs Vertex
+
+
+class RssSampler:
+    """Peak resident set size of this process, sampled from /proc when available."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = self.baseline = self.current()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Linux reports KiB
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.baseline = self.peak = self.current()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def share_runtime():
+    """Let AppTest instances run concurrently, like sessions on one server.
+
+    AppTest.run installs a throwaway mock Runtime (and st.secrets) for each
+    run and clears it afterwards, which breaks any other session mid-run.
+    Install one shared runtime and secrets instead and hide them from AppTest.
+    Script compilation is serialized too: ast.parse isn't thread-safe on 3.11.
+    """
+    from unittest.mock import MagicMock
+
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner import magic
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = types.SimpleNamespace(_instance=None)
+    secrets = Secrets()
+    secrets._secrets = dict(SECRETS)
+    st.secrets = secrets
+
+    add_magic, compile_lock = magic.add_magic, threading.Lock()
+
+    def locked_add_magic(*args, **kwargs):
+        with compile_lock:
+            return add_magic(*args, **kwargs)
+    magic.add_magic = locked_add_magic
+
+
+def timed(samples, name, at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    samples[name].append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(f"{name}: {at.exception[0].value}")
+
+
+def run_session(app_path, session_no, args, samples, counts):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_no)
+    at = AppTest.from_file(app_path, default_timeout=args.timeout)
+    timed(samples, 'load', at, args.timeout)
+    for _ in range(args.iterations):
+        query = rng.choice(QUERIES[:args.queries])
+        at.text_input[0].input(query)
+        at.button(key="analyze_btn").click()
+        timed(samples, 'search', at, args.timeout)
+        counts['searches'] += 1
+        counts[f'query:{query}'] += 1
+
+        df = at.session_state['df']
+        at.session_state['selected_video_id'] = df['Video ID'].iloc[rng.randrange(min(len(df), 20))]
+        timed(samples, 'select', at, args.timeout)
+
+        at.button(key='edit_btn').click()
+        timed(samples, 'ai_submit', at, args.timeout)
+        counts['ai_jobs'] += 1
+        submitted = time.perf_counter()
+        # Poll like job_monitor does until the report button shows up
+        while not any(b.key == 'edit_report_btn' for b in at.button):
+            if time.perf_counter() - submitted > args.timeout:
+                raise TimeoutError("AI job did not finish")
+            time.sleep(args.poll)
+            timed(samples, 'poll', at, args.timeout)
+        samples['ai_result'].append(time.perf_counter() - submitted)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent sessions against the dashboard with stub backends.")
+    parser.add_argument("--app", default="app.py", help="app.py or app2.py")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=2, help="search -> select -> AI rounds per session")
+    parser.add_argument("--queries", type=int, default=3, help="distinct queries in the mix (fewer = more cache hits)")
+    parser.add_argument("--youtube-latency", type=float, default=0.15, help="seconds per YouTube API call")
+    parser.add_argument("--transcript-latency", type=float, default=0.3)
+    parser.add_argument("--thumbnail-latency", type=float, default=0.02)
+    parser.add_argument("--model-latency", type=float, default=1.0)
+    parser.add_argument("--poll", type=float, default=0.25, help="seconds between reruns while waiting for an AI job")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args(argv)
+    args.queries = max(1, min(args.queries, len(QUERIES)))
+
+    app_path = os.path.abspath(args.app)
+    sys.path.insert(0, os.path.dirname(app_path))
+    # Keep the persistent indexes out of the real data directory
+    os.environ.setdefault("GEN_AXE_DATA_DIR", tempfile.mkdtemp(prefix="gen_axe_load_"))
+
+    stubs = StubBackends(args.youtube_latency, args.transcript_latency, args.thumbnail_latency, args.model_latency)
+    stubs.install()
+    share_runtime()
+
+    # Each session records into its own samples / counts (no shared mutable state between
+    # session threads); they are merged once every session has finished, failed ones included
+    sessions = [(defaultdict(list), Counter()) for _ in range(args.sessions)]
+    errors = []
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [pool.submit(run_session, app_path, n, args, *sessions[n]) for n in range(args.sessions)]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(repr(e))
+        wall = time.perf_counter() - started
+    samples, counts = defaultdict(list), Counter()
+    for session_samples, session_counts in sessions:
+        for name, values in session_samples.items():
+            samples[name].extend(values)
+        counts.update(session_counts)
+
+    interactions = sum(len(v) for k, v in samples.items() if k != 'ai_result')
+    print(f"\n{args.app}: {args.sessions} sessions x {args.iterations} rounds, {args.queries} distinct queries, {wall:.1f}s wall")
+    print(f"Throughput: {interactions / wall:.1f} interactions/s, {counts['searches'] / wall:.2f} searches/s, {len(samples['ai_result']) / wall:.2f} AI results/s")
+    print(f"\n{'interaction':<12}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name in ['load', 'search', 'select', 'ai_submit', 'poll', 'ai_result']:
+        values = samples.get(name, [])
+        print(f"{name:<12}{len(values):>6}{percentile(values, 50):>10.0f}{percentile(values, 95):>10.0f}{percentile(values, 100):>10.0f}")
+
+    print(f"\nPeak RSS: {rss.peak / 2**20:.0f} MiB (baseline {rss.baseline / 2**20:.0f} MiB), "
+          f"~{(rss.peak - rss.baseline) / 2**20 / args.sessions:.1f} MiB per session")
+
+    # A cache hit is a lookup that never reached the stub backend
+    searches = counts['searches']
+    transcript_lookups = counts['ai_jobs']
+    print("\nCache hit rates:")
+    print(f"  market data   {1 - stubs.calls['youtube.search'] / searches if searches else 0:.0%}  ({stubs.calls['youtube.search']} search calls for {searches} searches)")
+    print(f"  transcripts   {1 - stubs.calls['transcript'] / transcript_lookups if transcript_lookups else 0:.0%}  ({stubs.calls['transcript']} fetches for {transcript_lookups} AI jobs)")
+    print(f"  video stats   {stubs.calls['youtube.video_ids']} IDs requested in {stubs.calls['youtube.videos']} videos.list calls")
+    print(f"  thumbnails    {stubs.calls['thumbnail']} downloads, {stubs.calls['model']} model calls")
+    import resilience
+    upstreams = [resilience.youtube_api, resilience.transcript_api, resilience.thumbnail_cdn]
+    print("  coalesced     " + ", ".join(f"{u.flights.shared} {u.name}" for u in upstreams) + " calls joined one already in flight")
+    if errors:
+        print(f"\n{len(errors)} session(s) failed:")
+        for error in errors[:10]:
+            print(f"  {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+
+from resilience import Upstream, UpstreamError, error_status
+from singleflight import SingleFlight
+from transcript_prep import estimate_tokens
+
+# ==========================================
+# LATENCY-AWARE MODEL ROUTER
+# ==========================================
+# Features ask for a tier, not a model name. Each tier lists models in order
+# of preference; models that are slow or failing for that tier drop to the
+# back, and a model that answers 404/403 (retired, no access) is skipped for
+# an hour. A request walks the list until one model answers.
+# Each model also has a requests-per-minute limit shared by every session: a
+# model with no free slot is skipped in favour of the next one, and only when
+# the whole tier is saturated does a request wait. Identical prompts within
+# RESPONSE_TTL are answered from a response cache, identical prompts already
+# in flight wait for that call instead of paying for their own, and every
+# call's estimated tokens and cost can be collected with tracking().
+
+TIERS = {
+    "fast": ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-2.0-flash"],
+    "strong": ["gemini-2.5-pro", "gemini-2.5-flash", "gemini-2.0-flash"],
+    "vision": ["gemini-2.5-flash", "gemini-2.5-pro", "gemini-2.0-flash"],
+}
+LATENCY_BUDGET = {"fast": 10, "strong": 60, "vision": 30}  # seconds, p95
+MODEL_TIMEOUT = 60  # seconds per attempt; pass it to the SDK too (generate_kwargs) so a hung call frees its worker
+RETIRE_FOR = 3600
+UNAVAILABLE_STATUS = {403, 404}
+RATE_LIMITS = {  # requests per minute
+    "gemini-2.5-pro": 5,
+    "gemini-2.5-flash": 10,
+    "gemini-2.5-flash-lite": 15,
+    "gemini-2.0-flash": 15,
+}
+PRICES = {  # USD per 1M tokens (input, output)
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+IMAGE_TOKENS = 258  # one image part
+RESPONSE_TTL = 6 * 3600
+RESPONSE_CACHE_SIZE = 2000
+
+
+class RateLimiter:
+    """Sliding one-minute window of request start times."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def _wait_time(self):
+        now = time.monotonic()
+        while self.calls and now - self.calls[0] >= 60:
+            self.calls.popleft()
+        if len(self.calls) < self.per_minute:
+            self.calls.append(now)
+            return 0.0
+        return 60 - (now - self.calls[0])
+
+    def try_acquire(self):
+        with self.lock:
+            return self._wait_time() == 0.0
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                wait_for = self._wait_time()
+            if wait_for == 0.0:
+                return
+            time.sleep(min(wait_for, 1.0))
+
+
+class ModelStats:
+    def __init__(self, window=50):
+        self.calls = deque(maxlen=window)  # (latency, ok)
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.calls.append((latency, ok))
+
+    def recent(self):
+        # A copy: iterating the deque while another thread records raises RuntimeError
+        with self.lock:
+            return list(self.calls)
+
+    def error_rate(self, calls=None):
+        calls = self.recent() if calls is None else calls
+        return sum(not ok for _, ok in calls) / len(calls) if calls else 0.0
+
+    def p95(self, calls=None):
+        latencies = sorted(lat for lat, ok in (self.recent() if calls is None else calls) if ok)
+        return latencies[int(len(latencies) * 0.95)] if latencies else None
+
+    def healthy(self, budget):
+        calls = self.recent()
+        if len(calls) >= 5 and self.error_rate(calls) > 0.5:
+            return False
+        p95 = self.p95(calls)
+        return p95 is None or p95 <= budget
+
+
+class ModelRouter:
+    def __init__(self, factory, tiers=TIERS, budgets=LATENCY_BUDGET, generate_kwargs=None):
+        self.factory = factory  # model name -> object with generate_content()
+        self.generate_kwargs = generate_kwargs or {}  # passed to every generate_content() call
+        self.tiers, self.budgets = tiers, budgets
+        self.models, self.upstreams, self.stats, self.retired, self.limiters = {}, {}, {}, {}, {}
+        self.responses = OrderedDict()  # cache key -> (time, model, text)
+        self.spend = defaultdict(float)
+        self.flights = SingleFlight()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        for name in {m for models in tiers.values() for m in models}:
+            self.stats[name] = ModelStats()
+            self.limiters[name] = RateLimiter(RATE_LIMITS.get(name, 10))
+            # One breaker and worker pool per model, so an overloaded model doesn't block its fallbacks
+            self.upstreams[name] = Upstream(f"Gemini ({name})", timeout=MODEL_TIMEOUT, deadline=2 * MODEL_TIMEOUT, retries=1,
+                                            hedge=False, failure_threshold=3, reset_after=60, workers=8)
+
+    def _model(self, name):
+        with self.lock:
+            if name not in self.models:
+                self.models[name] = self.factory(name)
+            return self.models[name]
+
+    def route(self, tier):
+        now = time.monotonic()
+        models = [m for m in self.tiers[tier] if now - self.retired.get(m, -RETIRE_FOR) >= RETIRE_FOR]
+        models = models or list(self.tiers[tier])  # everything retired: try anyway
+        healthy = [m for m in models if self.stats[m].healthy(self.budgets[tier])]
+        return healthy + [m for m in models if m not in healthy]
+
+    @contextmanager
+    def tracking(self, usage):
+        """Append a usage record for every generate() on this thread to `usage`."""
+        previous = getattr(self.local, "usage", None)
+        self.local.usage = usage
+        try:
+            yield usage
+        finally:
+            self.local.usage = previous
+
+    def _track(self, name, contents, text, cached):
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        tokens_in = sum(estimate_tokens(p) if isinstance(p, str) else IMAGE_TOKENS for p in parts)
+        tokens_out = estimate_tokens(text)
+        price_in, price_out = PRICES.get(name, (0.0, 0.0))
+        cost = 0.0 if cached else (tokens_in * price_in + tokens_out * price_out) / 1e6
+        with self.lock:
+            self.spend[name] += cost
+        usage = getattr(self.local, "usage", None)
+        if usage is not None:
+            usage.append({'model': name, 'tokens_in': tokens_in, 'tokens_out': tokens_out, 'cost': cost, 'cached': cached})
+
+    def _cache_key(self, tier, contents, cache_key):
+        if cache_key is not None:
+            return tier, cache_key
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        if all(isinstance(p, str) for p in parts):
+            return tier, hashlib.sha1("\x00".join(parts).encode()).hexdigest()
+        return None  # images without a caller-supplied key aren't cached
+
+    def _cached(self, key):
+        with self.lock:
+            hit = self.responses.get(key)
+            if hit and time.time() - hit[0] < RESPONSE_TTL:
+                self.responses.move_to_end(key)
+                return hit
+        return None
+
+    def _store(self, key, name, text):
+        with self.lock:
+            self.responses[key] = (time.time(), name, text)
+            while len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+
+    def _attempt(self, name, contents):
+        # Returns the text, or None (and the error) if this model should be skipped
+        start = time.monotonic()
+        try:
+            text = self.upstreams[name].call(self._model(name).generate_content, contents, idempotent=False, **self.generate_kwargs).text
+        except Exception as e:
+            self.stats[name].record(time.monotonic() - start, ok=False)
+            status = error_status(getattr(e, "cause", e))
+            if status in UNAVAILABLE_STATUS:
+                self.retired[name] = time.monotonic()
+            elif not isinstance(e, UpstreamError):
+                raise  # bad request / blocked content: another model won't help
+            return None, e
+        self.stats[name].record(time.monotonic() - start, ok=True)
+        return text, None
+
+    def generate(self, tier, contents, cache_key=None):
+        """Generate text on the best available model of `tier`, failing over down the list.
+
+        `cache_key` identifies requests whose contents can't be hashed (images). A part
+        of `contents` may be a zero-argument callable (e.g. an image download): it is
+        only called when a model actually has to run, not on a cache hit or a shared call.
+        """
+        key = self._cache_key(tier, contents, cache_key)
+        hit = self._cached(key) if key else None
+        if hit:
+            self._track(hit[1], contents, hit[2], cached=True)
+            return hit[2]
+        if key is None:
+            name, text = self._generate(tier, contents)
+            self._track(name, contents, text, cached=False)
+            return text
+
+        future, leader = self.flights.begin(key)
+        if not leader:
+            name, text = future.result()
+            self._track(name, contents, text, cached=True)
+            return text
+        try:
+            hit = self._cached(key)  # stored while we were joining
+            name, text = hit[1:] if hit else self._generate(tier, contents)
+        except BaseException as e:
+            self.flights.finish(key, future, error=e)
+            raise
+        self._store(key, name, text)
+        self.flights.finish(key, future, (name, text))
+        self._track(name, contents, text, cached=hit is not None)
+        return text
+
+    def _generate(self, tier, contents):
+        if isinstance(contents, (list, tuple)):
+            contents = [part() if callable(part) else part for part in contents]
+        error, saturated = None, []
+        for name in self.route(tier):
+            if not self.limiters[name].try_acquire():
+                saturated.append(name)
+                continue
+            text, error = self._attempt(name, contents)
+            if text is not None:
+                return name, text
+        # Every usable model is out of requests this minute: queue for the preferred one
+        for name in saturated:
+            self.limiters[name].acquire()
+            text, error = self._attempt(name, contents)
+            if text is not None:
+                return name, text
+        raise UpstreamError(f"Gemini {tier} tier", getattr(error, "cause", error))
+
+    def snapshot(self):
+        now = time.monotonic()
+        rows = []
+        for name, stats in sorted(self.stats.items()):
+            calls = stats.recent()
+            p95 = stats.p95(calls)
+            retired = now - self.retired.get(name, -RETIRE_FOR) < RETIRE_FOR
+            rows.append({
+                'Model': name,
+                'Calls': len(calls),
+                'Error %': round(stats.error_rate(calls) * 100, 1),
+                'p95 (s)': round(p95, 1) if p95 is not None else None,
+                'Status': "unavailable" if retired else self.upstreams[name].breaker.state,
+                'Est. $': round(self.spend[name], 4),
+            })
+        return rows
@@ -0,0 +1,51 @@
+import pandas as pd
+
+# ==========================================
+# QUERY COMPARISON (OVERLAP & UNIQUE VIDEOS)
+# ==========================================
+# Two result sets are split by Video ID into "only A", "both" and "only B".
+# Each part keeps the video's rank in the result set(s) it came from, and is
+# summarised by size, views and engagement, so it is easy to see whether the
+# videos a query adds are the ones that actually engage. Set arithmetic on the
+# ID index only; no extra API calls.
+
+
+def _ranked(df):
+    df = df.drop_duplicates('Video ID').reset_index(drop=True)
+    df['Rank'] = df.index + 1
+    return df.set_index('Video ID')
+
+
+def compare_results(a, b):
+    """{'Only A' | 'Both' | 'Only B': DataFrame} for two result sets keyed by 'Video ID'."""
+    a, b = _ranked(a), _ranked(b)
+    shared = a.index.intersection(b.index, sort=False)
+    both = a.loc[shared].drop(columns='Rank')
+    both.insert(0, 'Rank B', b.loc[shared, 'Rank'])
+    both.insert(0, 'Rank A', a.loc[shared, 'Rank'])
+    return {
+        'Only A': a.drop(shared).reset_index(),
+        'Both': both.sort_values('Engagement', ascending=False).reset_index(),
+        'Only B': b.drop(shared).reset_index(),
+    }
+
+
+def summarize(parts):
+    """One row per part: videos, share of views and engagement."""
+    total_views = sum(part['Views'].sum() for part in parts.values()) or 1
+    rows = []
+    for name, part in parts.items():
+        rows.append({
+            'Part': name,
+            'Videos': len(part),
+            'Views': int(part['Views'].sum()),
+            'View Share %': round(part['Views'].sum() / total_views * 100, 1),
+            'Median Views': int(part['Views'].median()) if len(part) else 0,
+            'Median Engagement %': round(part['Engagement'].median(), 2) if len(part) else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+
+def jaccard(parts):
+    union = sum(len(part) for part in parts.values())
+    return len(parts['Both']) / union if union else 0.0
@@ -0,0 +1,253 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from singleflight import SingleFlight
+
+# ==========================================
+# RESILIENT UPSTREAM CALLS
+# ==========================================
+# Every network call goes through an Upstream:
+#   - its own bounded worker pool, so a hung upstream can only exhaust its own
+#     workers, never another upstream's
+#   - per-attempt timeout (counted from when a worker picks the call up) +
+#     overall deadline, so a hung socket can't stall the page
+#   - jittered exponential backoff, only for retryable errors (timeouts, 429, 5xx)
+#   - hedging: idempotent reads slower than the observed p95 get a duplicate
+#     request, first answer wins (callers turn it off for reads billed per
+#     call, e.g. 100-unit search().list; 1-unit videos/channels reads hedge)
+#   - circuit breaker: after repeated failures we fail fast for a while and
+#     serve the last good response for the same key instead
+#   - coalescing: identical idempotent calls already in flight share one
+#     attempt chain and its result (or error)
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+QUEUE_POLL = 0.25  # how often a waiter checks whether its queued attempt has started
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class UpstreamError(Exception):
+    """Friendly error surfaced to the UI once retries and fallbacks are exhausted."""
+
+    def __init__(self, name, cause):
+        self.name, self.cause = name, cause
+        super().__init__(f"{name} is not responding right now ({describe_error(cause)}). Please try again in a moment.")
+
+
+def error_status(exc):
+    resp = getattr(exc, "resp", None)  # googleapiclient HttpError
+    if getattr(resp, "status", None):
+        return int(resp.status)
+    response = getattr(exc, "response", None)  # requests
+    if getattr(response, "status_code", None):
+        return response.status_code
+    code = getattr(exc, "code", None)  # google.api_core
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc):
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Socket / connection problems (requests' ConnectionError and Timeout are OSErrors too)
+    return isinstance(exc, OSError)
+
+
+def describe_error(exc):
+    if isinstance(exc, CircuitOpen):
+        return "paused after repeated failures"
+    if isinstance(exc, TimeoutError):
+        return "timed out"
+    status = error_status(exc)
+    return f"HTTP {status}" if status else exc.__class__.__name__
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_after=30):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half-open"  # let exactly one probe through
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state, self.failures = "closed", 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                self.state, self.opened_at = "open", time.monotonic()
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session with a default timeout, for clients that don't pass one."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+class Upstream:
+    def __init__(self, name, timeout=10, deadline=30, retries=3, base_delay=0.5, max_delay=8,
+                 hedge=True, failure_threshold=5, reset_after=30, stale_cache=256, workers=8):
+        self.name = name
+        # Attempts run here so we can stop waiting on them. A timed-out attempt keeps its
+        # worker until its socket times out (callers set the transport timeout to `timeout`)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"upstream-{name}")
+        self.timeout, self.deadline = timeout, deadline
+        self.retries, self.base_delay, self.max_delay = retries, base_delay, max_delay
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.latencies = deque(maxlen=200)
+        self.stale, self.stale_size = OrderedDict(), stale_cache
+        self.stats = {"calls": 0, "retries": 0, "hedged": 0, "stale_served": 0, "failed": 0}
+        self.flights = SingleFlight()
+        self.lock = threading.Lock()
+
+    def p95(self):
+        with self.lock:  # attempts append from other threads
+            latencies = sorted(self.latencies)
+        if len(latencies) < 20:
+            return None
+        return latencies[int(len(latencies) * 0.95)]
+
+    def call(self, fn, *args, key=None, idempotent=True, hedge=True, **kwargs):
+        """Run fn(*args, **kwargs) with deadlines, retries, hedging and the breaker.
+
+        `key` identifies the response for stale fallback and, for idempotent
+        calls, lets concurrent identical calls wait on the one in flight;
+        `idempotent=False` disables hedging and coalescing (e.g. paid model
+        calls, which the model router coalesces itself); `hedge=False` only
+        disables hedging (e.g. reads billed per call against a quota).
+        """
+        self.stats["calls"] += 1
+        hedge = hedge and idempotent and self.hedge
+        if key is None or not idempotent:
+            return self._call(fn, args, kwargs, key, hedge)
+        return self.flights.do(key, self._call, fn, args, kwargs, key, hedge)
+
+    def _call(self, fn, args, kwargs, key, hedge):
+        if not self.breaker.allow():
+            return self._fallback(key, CircuitOpen(self.name))
+
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, args, kwargs, deadline, hedge)
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()  # upstream is healthy, the request was bad
+                    raise
+                attempt += 1
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt > self.retries or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    return self._fallback(key, e)
+                self.stats["retries"] += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            if key is not None:
+                self._remember(key, result)
+            return result
+
+    def _submit(self, fn, args, kwargs):
+        started = []  # monotonic start time, once a worker has picked the call up
+
+        def run():
+            started.append(time.monotonic())
+            return fn(*args, **kwargs)
+        future = self.executor.submit(run)
+        future.started = started
+        return future
+
+    def _attempt(self, fn, args, kwargs, deadline, hedge):
+        pending = {self._submit(fn, args, kwargs)}
+        hedge_after = self.p95() if hedge else None
+        if hedge_after is not None and hedge_after >= self.timeout:
+            hedge_after = None
+
+        error = None
+        while pending:
+            now = time.monotonic()
+            running = [f.started[0] for f in pending if f.started]
+            if len(running) < len(pending):
+                until = now + QUEUE_POLL  # look again once it has a worker
+            else:
+                until = max(running) + self.timeout
+                if hedge_after is not None:
+                    until = min(until, min(running) + hedge_after)
+            done, pending = wait(pending, timeout=max(0, min(until, deadline) - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    with self.lock:
+                        self.latencies.append(time.monotonic() - future.started[0])
+                    return future.result()
+                error = future.exception()
+            if done:
+                continue
+
+            now = time.monotonic()
+            running = [f.started[0] for f in pending if f.started]
+            if now >= deadline:
+                for future in pending:
+                    future.cancel()  # still queued: never run it
+                raise DeadlineExceeded(f"{self.name} did not answer within {self.deadline:.0f}s")
+            if len(running) == len(pending) and all(now >= t + self.timeout for t in running):
+                raise DeadlineExceeded(f"{self.name} took longer than {self.timeout:.0f}s")
+            if hedge_after is not None and running and now >= min(running) + hedge_after:
+                self.stats["hedged"] += 1
+                pending.add(self._submit(fn, args, kwargs))
+                hedge_after = None
+        raise error
+
+    def _remember(self, key, result):
+        with self.lock:
+            self.stale[key] = result
+            self.stale.move_to_end(key)
+            while len(self.stale) > self.stale_size:
+                self.stale.popitem(last=False)
+
+    def _fallback(self, key, error):
+        with self.lock:
+            if key is not None and key in self.stale:
+                self.stats["stale_served"] += 1
+                return self.stale[key]
+        self.stats["failed"] += 1
+        raise UpstreamError(self.name, error) from error
+
+
+# One instance per upstream, shared by every session in the process
+youtube_api = Upstream("YouTube Data API", timeout=10, deadline=30, workers=16)
+transcript_api = Upstream("YouTube Transcripts", timeout=8, deadline=20, workers=8)
+thumbnail_cdn = Upstream("Thumbnail CDN", timeout=5, deadline=12, stale_cache=64, workers=16)
+# Model calls get one Upstream per model, see model_router.py
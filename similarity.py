@@ -0,0 +1,174 @@
+import re
+import threading
+import zlib
+
+import numpy as np
+
+# ==========================================
+# LOCAL SIMILAR-VIDEO INDEX (HASHED TF-IDF)
+# ==========================================
+# Every video we fetch is embedded with the hashing trick into a large sparse
+# space: word unigrams + bigrams from the title and whole tags (metadata), and
+# transcript words in their own buckets. Stopwords never reach the hash. The
+# metadata and transcript parts are L2-normalised separately before they are
+# combined, so a long transcript can't drown out a near-identical title.
+# All non-zeros live in flat (column, weight, owner) arrays; a top-k cosine
+# query is one gather + bincount over them, ~25ms at 100k videos with titles
+# and tags.
+
+DIM = 1 << 18  # hashed columns; sparse, so collisions stay rare without costing memory
+GROUP_WEIGHTS = np.array([0.8, 0.6], dtype=np.float32)  # metadata, transcript (squares sum to 1)
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+    a about after all also am an and any are as at be because been but by can could did do does
+    for from get got had has have he her here him his how i if in into is it its just me more most
+    my no not now of on one only or other our out over she so some than that the their them then
+    there these they this those to too up us very was we were what when where which who why will
+    with would you your um uh yeah oh okay ok gonna wanna
+""".split())
+
+
+def _bucket(token, dim):
+    return zlib.crc32(token.encode("utf-8")) % dim
+
+
+def _tokens(text):
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS] if text else []
+
+
+class SimilarityIndex:
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self.lock = threading.Lock()
+        # One entry per (video, column): hashed column, log-tf, group (0 metadata, 1 transcript),
+        # owning row and the current idf-weighted, normalised value. Replaced entries are zeroed.
+        self.cols = np.zeros(1024, dtype=np.int32)
+        self.raw = np.zeros(1024, dtype=np.float32)
+        self.group = np.zeros(1024, dtype=np.int8)
+        self.owner = np.zeros(1024, dtype=np.int32)
+        self.weights = np.zeros(1024, dtype=np.float32)
+        self.nnz = self.dead = 0
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.ids, self.rows, self.spans, self.meta, self.docs = [], {}, [], {}, {}
+        self.idf_size = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _embed(self, doc):
+        counts = {}
+        words = _tokens(doc.get("title"))
+        meta = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+        meta += ["#" + str(tag).lower().strip() for tag in doc.get("tags") or []]
+        for group, toks in ((0, meta), (1, ["t:" + tok for tok in _tokens(doc.get("transcript"))])):
+            for tok in toks:
+                key = (group, _bucket(tok, self.dim))
+                counts[key] = counts.get(key, 0) + 1
+        group = np.fromiter((g for g, _ in counts), dtype=np.int8, count=len(counts))
+        cols = np.fromiter((c for _, c in counts), dtype=np.int32, count=len(counts))
+        raw = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        return cols, raw, group
+
+    def _weight(self, cols, raw, group, owner, n):
+        # idf-weight, L2-normalise each (video, group) part, mix the parts, normalise each video
+        w = raw * self.idf[cols]
+        key = owner * 2 + group
+        part_norm = np.sqrt(np.bincount(key, w * w, minlength=2 * n)).astype(np.float32)
+        w = w / np.maximum(part_norm[key], 1e-12) * GROUP_WEIGHTS[group]
+        norm = np.sqrt(np.bincount(owner, w * w, minlength=n)).astype(np.float32)
+        return w / np.maximum(norm[owner], 1e-12)
+
+    def _append(self, cols, raw, group, row, weights):
+        end = self.nnz + len(cols)
+        if end > len(self.cols):
+            cap = max(end, 2 * len(self.cols))
+            for name in ("cols", "raw", "group", "owner", "weights"):
+                grown = np.zeros(cap, dtype=getattr(self, name).dtype)
+                grown[:self.nnz] = getattr(self, name)[:self.nnz]
+                setattr(self, name, grown)
+        self.cols[self.nnz:end], self.raw[self.nnz:end], self.group[self.nnz:end] = cols, raw, group
+        self.owner[self.nnz:end], self.weights[self.nnz:end] = row, weights
+        span = (self.nnz, end)
+        self.nnz = end
+        return span
+
+    def _refresh_idf(self):
+        # Drop replaced entries, then re-weight everything against the current document frequencies
+        n = len(self.ids)
+        if self.dead:
+            keep = self.raw[:self.nnz] != 0
+            position = np.cumsum(keep) - 1
+            self.spans = [(int(position[start]), int(position[end - 1]) + 1) if end > start else (0, 0)
+                          for start, end in self.spans]
+            for name in ("cols", "raw", "group", "owner", "weights"):
+                kept = getattr(self, name)[:self.nnz][keep]
+                grown = np.zeros(max(1024, 2 * len(kept)), dtype=kept.dtype)
+                grown[:len(kept)] = kept
+                setattr(self, name, grown)
+            self.nnz, self.dead = int(keep.sum()), 0
+        self.idf = (np.log((1 + n) / (1 + self.doc_freq)) + 1).astype(np.float32)
+        end = self.nnz
+        self.weights[:end] = self._weight(self.cols[:end], self.raw[:end], self.group[:end], self.owner[:end], n)
+        self.idf_size = n
+
+    def upsert(self, video_id, title=None, tags=None, transcript=None, **meta):
+        """Add or update one video. Missing fields keep their previous value."""
+        with self.lock:
+            doc = self.docs.setdefault(video_id, {})
+            for key, value in (("title", title), ("tags", tags), ("transcript", transcript)):
+                if value is not None:
+                    doc[key] = value
+            self.meta.setdefault(video_id, {}).update(meta, Title=doc.get("title", ""))
+
+            cols, raw, group = self._embed(doc)
+            row = self.rows.get(video_id)
+            if row is None:
+                row = len(self.ids)
+                self.ids.append(video_id)
+                self.rows[video_id] = row
+                self.spans.append((0, 0))
+            else:
+                start, end = self.spans[row]
+                self.doc_freq[np.unique(self.cols[start:end])] -= 1
+                self.raw[start:end] = self.weights[start:end] = 0
+                self.dead += end - start
+            self.doc_freq[np.unique(cols)] += 1
+            weights = self._weight(cols, raw, group, np.zeros(len(cols), dtype=np.int32), 1)
+            self.spans[row] = self._append(cols, raw, group, row, weights)
+
+            # Amortised O(1): re-weight everything only when the corpus grew by 25%
+            # (or replaced entries make up half the arrays, e.g. after many transcript updates)
+            if len(self.ids) >= max(32, self.idf_size * 1.25) or self.dead > max(4096, self.nnz // 2):
+                self._refresh_idf()
+
+    def add_frame(self, df):
+        if df.empty:
+            return
+        for rec in df[["Video ID", "Title", "Tags", "Thumbnail"]].to_dict("records"):
+            self.upsert(rec["Video ID"], title=rec["Title"], tags=rec["Tags"], Thumbnail=rec["Thumbnail"])
+
+    def query(self, video_id=None, text=None, k=10):
+        """Top-k cosine neighbours of an indexed video or of free text."""
+        with self.lock:
+            n = len(self.ids)
+            if n == 0:
+                return []
+            if video_id is not None and video_id in self.rows:
+                start, end = self.spans[self.rows[video_id]]
+                q_cols, q_weights = self.cols[start:end], self.weights[start:end]
+            else:
+                q_cols, raw, group = self._embed({"title": text or ""})
+                q_weights = self._weight(q_cols, raw, group, np.zeros(len(q_cols), dtype=np.int32), 1)
+            q = np.zeros(self.dim, dtype=np.float32)
+            q[q_cols] = q_weights
+            end = self.nnz
+            scores = np.bincount(self.owner[:end], self.weights[:end] * q[self.cols[:end]], minlength=n)
+            if video_id in self.rows:
+                scores[self.rows[video_id]] = -np.inf
+            k = min(k, n - (video_id in self.rows))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[i], float(scores[i]), self.meta[self.ids[i]]) for i in top]
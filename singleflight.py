@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import Future
+
+# ==========================================
+# REQUEST COALESCING (SINGLE FLIGHT)
+# ==========================================
+# When the same request is already in flight, a second caller waits on the
+# first caller's future instead of going upstream itself: ten sessions asking
+# for the same search page, thumbnail or AI audit at once cost one call, and a
+# failure is shared the same way (no stampede of retries against an upstream
+# that is already struggling). Nothing is kept once the call finishes; caching
+# finished results stays the job of the caches in front of and behind this.
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}  # key -> Future of the call in flight
+        self.leaders = self.shared = 0
+
+    def begin(self, key):
+        """(future, leader): the leader must finish() the call; everyone else waits on future."""
+        with self.lock:
+            future = self.flights.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self.flights[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        with self.lock:
+            self.flights.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """fn(*args, **kwargs), run once for all concurrent callers with the same key."""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
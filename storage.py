@@ -0,0 +1,14 @@
+import os
+
+# ==========================================
+# LOCAL DATA DIRECTORY
+# ==========================================
+# Persistent indexes and stores live here. Override with GEN_AXE_DATA_DIR
+# (e.g. a mounted volume when deployed).
+
+DATA_DIR = os.environ.get("GEN_AXE_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".gen_axe"))
+
+
+def data_path(name):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
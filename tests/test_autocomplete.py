@@ -0,0 +1,54 @@
+import random
+import string
+
+from autocomplete import SHORT_TOP, PrefixIndex, normalize
+
+
+def brute_force(index, prefix, k):
+    prefix = normalize(prefix)
+    matches = [entry for key, entry in index.terms.items()
+               if any(word_start.startswith(prefix) for word_start, _ in index._entries(key))]
+    return sorted(matches, key=lambda e: (e[2], e[1]), reverse=True)[:k]
+
+
+def ranks(results):
+    return [(cached, weight) for _, weight, cached in results]
+
+
+def test_matches_any_word_start():
+    index = PrefixIndex()
+    index.add_many([("AI News", 3), ("#gaming news", 2), ("newsletter tips", 1)])
+    assert [text for text, _, _ in index.suggest("news", k=5)] == ["AI News", "#gaming news", "newsletter tips"]
+    assert [text for text, _, _ in index.suggest("ai n")] == ["AI News"]
+    assert index.suggest("xyz") == []
+
+
+def test_weights_accumulate_and_cached_ranks_first():
+    index = PrefixIndex()
+    index.add_many([("ai news", 1), ("ai tools", 5)])
+    index.add("ai news", 10)
+    assert index.suggest("ai")[0][:2] == ("ai news", 11)
+    index.add("ai art", 0.5, cached=True)
+    assert index.suggest("ai")[0] == ("ai art", 0.5, True)
+
+
+def test_short_prefix_top_lists_match_a_full_scan():
+    # _promote keeps a running top list per 0-2 letter prefix; it must agree with a scan
+    rng = random.Random(3)
+    index = PrefixIndex()
+    words = ["".join(rng.choices("abc", k=rng.randint(1, 4))) for _ in range(300)]
+    for _ in range(40):
+        batch = [(" ".join(rng.sample(words, rng.randint(1, 3))), rng.choice([0.5, 1, 2, 10])) for _ in range(25)]
+        index.add_many(batch, cached=rng.random() < 0.1)
+    for prefix in ["", "a", "b", "c", "ab", "ca", "bb"]:
+        for k in (1, 6, SHORT_TOP):
+            assert ranks(index.suggest(prefix, k)) == ranks(brute_force(index, prefix, k)), (prefix, k)
+
+
+def test_long_prefixes_match_a_full_scan():
+    rng = random.Random(5)
+    index = PrefixIndex()
+    terms = [" ".join("".join(rng.choices(string.ascii_lowercase[:4], k=4)) for _ in range(2)) for _ in range(500)]
+    index.add_many((term, rng.randint(1, 20)) for term in terms)
+    for prefix in ["abc", "dd", "abcd a", "bad"]:
+        assert ranks(index.suggest(prefix, 8)) == ranks(brute_force(index, prefix, 8))
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+from crawler import RESULT_CAP, SEARCH_COST, crawl_search
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def page(ids, total=0, next_token=None):
+    resp = {'items': [{'id': {'videoId': vid}} for vid in ids], 'pageInfo': {'totalResults': total}}
+    if next_token:
+        resp['nextPageToken'] = next_token
+    return resp
+
+
+def test_crawl_pages_windows_and_dedupes():
+    calls = []
+
+    def search_page(after, before, token, charge):
+        charge()
+        calls.append((after, before, token))
+        if token is None:
+            return page([after, "shared"], total=3, next_token="p2")
+        return page([before])
+
+    ids, report = crawl_search(search_page, START, START + timedelta(days=4), initial_windows=2)
+    assert report['pages'] == len(calls) == 4
+    assert report['units'] == 4 * SEARCH_COST
+    assert (report['windows'], report['splits'], report['failed']) == (2, 0, 0)
+    # Windows share their boundary, so "2024-01-03..." is found by both, and "shared" by every first page
+    assert sorted(ids) == ["2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z", "2024-01-05T00:00:00Z", "shared"]
+
+
+def test_crawl_splits_windows_over_the_result_cap():
+    windows = []
+
+    def search_page(after, before, token, charge):
+        charge()
+        windows.append((after, before))
+        # Only the full range reports more results than search() will return
+        total = RESULT_CAP + 1 if (after, before) == ("2024-01-01T00:00:00Z", "2024-01-05T00:00:00Z") else 10
+        return page([f"{after}/{before}"], total=total)
+
+    ids, report = crawl_search(search_page, START, START + timedelta(days=4), initial_windows=1)
+    assert report['splits'] == 1
+    assert report['windows'] == 3
+    assert sorted(windows[1:]) == [("2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z"),
+                                   ("2024-01-03T00:00:00Z", "2024-01-05T00:00:00Z")]
+    assert len(ids) == 3
+
+
+def test_crawl_stops_at_budget_and_survives_failed_windows():
+    def search_page(after, before, token, charge):
+        charge()
+        if after.startswith("2024-01-01"):
+            raise RuntimeError("window failed")
+        return page([after], next_token="more")  # never runs out of pages
+
+    ids, report = crawl_search(search_page, START, START + timedelta(days=4), budget_units=5 * SEARCH_COST,
+                               initial_windows=2)
+    assert report['budget_exhausted']
+    assert report['failed'] == 1
+    assert report['pages'] == 4
+    assert report['units'] == 5 * SEARCH_COST  # the failed request was sent, so it is spent
+
+
+def test_crawl_charges_every_attempt():
+    attempts = []
+
+    def search_page(after, before, token, charge):
+        # Like an Upstream call that retries twice: three requests sent for one page
+        for _ in range(3):
+            charge()
+            attempts.append(token)
+        return page([after])
+
+    ids, report = crawl_search(search_page, START, START + timedelta(days=4), budget_units=4 * SEARCH_COST,
+                               initial_windows=2, workers=1)
+    assert len(attempts) == 4
+    assert report['units'] == 4 * SEARCH_COST
+    assert report['pages'] == 1 and report['budget_exhausted']
@@ -0,0 +1,95 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from export import encode, frame_chunks, write_export
+from history import MarketHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    return MarketHistory(str(tmp_path / "history.sqlite"))
+
+
+def frame(views, **extra):
+    return pd.DataFrame({'Video ID': [f"v{i}" for i in range(len(views))], 'Views': views,
+                         'Tags': [["ai", "news"]] * len(views), **extra})
+
+
+def rows(history, columns=('Video ID', 'Views', 'Query'), **filters):
+    chunks = list(history.chunks(list(columns), **filters))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(columns))
+
+
+# ---- latest_only applies the other filters inside its subquery (6ad8ff7) ----
+
+def test_latest_only_keeps_latest_snapshot_of_the_filtered_rows(history):
+    history.record(frame([100, 200]), "ai news", "US")
+    history.record(frame([150, 250]), "ai tools", "US")  # same videos, fetched later by another query
+    latest = rows(history, query="ai news", latest_only=True)
+    assert sorted(latest['Views']) == [100, 200]
+    assert set(latest['Query']) == {"ai news"}
+    assert history.count(query="ai news", latest_only=True) == 2
+
+
+def test_latest_only_with_region_and_min_views(history):
+    history.record(frame([100, 5000]), "ai", "US")
+    history.record(frame([120, 10]), "ai", "IN")
+    assert sorted(rows(history, region="US", latest_only=True)['Views']) == [100, 5000]
+    # v1's latest row overall (10 views) is filtered out; its latest matching row remains
+    assert list(rows(history, min_views=1000, latest_only=True)['Views']) == [5000]
+
+
+def test_latest_only_without_filters_is_one_row_per_video(history):
+    history.record(frame([1, 2]), "a", "US")
+    history.record(frame([3, 4]), "b", "US")
+    assert sorted(rows(history, latest_only=True)['Views']) == [3, 4]
+
+
+def test_latest_fetch_returns_the_most_recent_fetch_of_a_query(history, monkeypatch):
+    stamps = iter(["2024-01-01T00:00:00", "2024-01-02T00:00:00"])
+    monkeypatch.setattr("history.time.strftime", lambda fmt: next(stamps))
+    history.record(frame([1, 2, 3]), "ai", "US")
+    history.record(frame([7]), "ai", "US")
+    assert list(rows(history, query="ai", latest_fetch=True)['Views']) == [7]
+
+
+def test_reads_do_not_block_writers(history):
+    history.record(frame(list(range(20))), "ai", "US")
+    chunks = history.chunks(chunk_rows=5)
+    next(chunks)  # cursor still open
+    history.record(frame([1]), "ai", "US")
+    assert sum(len(c) for c in chunks) == 15
+
+
+# ---- Parquet schema comes from the history column types (40d3bf3) ----
+
+def parquet(chunks):
+    return pq.read_table(io.BytesIO(b"".join(encode(chunks, 'Parquet'))))
+
+
+def test_parquet_types_from_history_schema_not_first_chunk():
+    # Engagement is all NULL in the first chunk: inferred, it would be typed null and the second chunk would fail
+    df = frame([1, 2, 3, 4], Engagement=[None, None, 1.5, 2.5])
+    table = parquet(frame_chunks(df, ['Video ID', 'Views', 'Engagement', 'Tags'], chunk_rows=2))
+    assert str(table.schema.field('Engagement').type) == 'double'
+    assert str(table.schema.field('Views').type) == 'int64'
+    assert table.column('Engagement').to_pylist() == [None, None, 1.5, 2.5]
+    assert table.column('Tags').to_pylist()[0] == '["ai", "news"]'
+
+
+def test_parquet_from_history_round_trips(history):
+    history.record(frame([10, 20]), "ai", "US")
+    table = parquet(history.chunks(['Video ID', 'Views', 'Earnings', 'Query']))
+    assert table.column('Views').to_pylist() == [10, 20]
+    assert str(table.schema.field('Earnings').type) == 'double'
+
+
+def test_write_export_counts_rows(tmp_path):
+    path = tmp_path / "out.csv"
+    count, size = write_export(frame_chunks(frame([5, 50, 500]), ['Video ID', 'Views'], min_views=50), 'CSV', path)
+    assert count == 2
+    assert size == path.stat().st_size
+    assert path.read_text().splitlines() == ["Video ID,Views", "v1,50", "v2,500"]
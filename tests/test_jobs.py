@@ -0,0 +1,32 @@
+import threading
+import time
+
+from jobs import JobQueue
+
+
+def wait_done(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not queue.get(job_id).done:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+    return queue.get(job_id)
+
+
+def test_result_and_error_are_kept_on_the_job():
+    queue = JobQueue(max_workers=1)
+    ok = queue.submit("ok", lambda x: x * 2, 21)
+    bad = queue.submit("bad", lambda: 1 / 0)
+    assert wait_done(queue, ok).result == 42
+    assert wait_done(queue, bad).status == "error"
+    assert queue.pending([ok, bad, "missing"]) == []
+
+
+def test_coordinators_do_not_take_single_job_workers():
+    queue, release = JobQueue(max_workers=1, coordinator_workers=4), threading.Event()
+    batches = [queue.submit(f"batch {n}", release.wait, 5, coordinator=True) for n in range(4)]
+    single = queue.submit("audit", lambda: "done")
+    assert wait_done(queue, single, timeout=1).result == "done"
+    assert len(queue.pending(batches)) == 4
+    release.set()
+    for job_id in batches:
+        assert wait_done(queue, job_id).result is True
@@ -0,0 +1,119 @@
+import types
+
+import pytest
+
+from model_router import ModelRouter, RateLimiter
+from resilience import UpstreamError
+
+TIERS = {"fast": ["a", "b", "c"]}
+BUDGETS = {"fast": 10}
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = types.SimpleNamespace(status=status)
+
+
+class Model:
+    """generate_content() raises the model's queued errors, then answers with its name."""
+
+    def __init__(self, name, errors, calls):
+        self.name, self.errors, self.calls = name, errors, calls
+
+    def generate_content(self, contents, **kwargs):
+        self.calls.append((self.name, kwargs))
+        if self.errors.get(self.name):
+            raise self.errors[self.name].pop(0)
+        return types.SimpleNamespace(text=f"{self.name}: {contents}")
+
+
+@pytest.fixture
+def make_router():
+    def make(errors=None, **kwargs):
+        errors, calls = errors or {}, []
+        router = ModelRouter(lambda name: Model(name, errors, calls), TIERS, BUDGETS, **kwargs)
+        for api in router.upstreams.values():
+            api.base_delay = api.max_delay = 0.001
+        router.calls = calls
+        return router
+    return make
+
+
+def test_uses_first_model_and_passes_generate_kwargs(make_router):
+    router = make_router(generate_kwargs={'request_options': {'timeout': 5}})
+    assert router.generate("fast", "hi") == "a: hi"
+    assert router.calls == [("a", {'request_options': {'timeout': 5}})]
+
+
+def test_fails_over_when_a_model_keeps_failing(make_router):
+    router = make_router({"a": [HttpError(503), HttpError(503)]})
+    assert router.generate("fast", "hi") == "b: hi"
+    assert [name for name, _ in router.calls] == ["a", "a", "b"]  # one retry on a, then b
+    assert router.stats["a"].error_rate() == 1.0
+
+
+def test_retires_unavailable_models(make_router):
+    router = make_router({"a": [HttpError(404)]})
+    assert router.generate("fast", "one") == "b: one"
+    assert router.generate("fast", "two") == "b: two"
+    assert router.route("fast") == ["b", "c"]
+    assert [name for name, _ in router.calls] == ["a", "b", "b"]
+
+
+def test_bad_request_is_not_failed_over(make_router):
+    router = make_router({"a": [HttpError(400)]})
+    with pytest.raises(HttpError):
+        router.generate("fast", "hi")
+    assert [name for name, _ in router.calls] == ["a"]
+
+
+def test_whole_tier_failing_raises_upstream_error(make_router):
+    router = make_router({name: [HttpError(503)] * 2 for name in "abc"})
+    with pytest.raises(UpstreamError):
+        router.generate("fast", "hi")
+
+
+def test_unhealthy_models_drop_to_the_back(make_router):
+    router = make_router()
+    for _ in range(5):
+        router.stats["a"].record(1.0, ok=False)
+    router.stats["b"].record(30.0, ok=True)  # p95 over the 10s budget
+    assert router.route("fast") == ["c", "a", "b"]
+
+
+def test_saturated_model_is_skipped_for_the_next(make_router):
+    router = make_router()
+    router.limiters["a"] = RateLimiter(1)
+    assert router.generate("fast", "one") == "a: one"
+    assert router.generate("fast", "two") == "b: two"
+
+
+def test_identical_prompts_are_answered_from_cache(make_router):
+    router = make_router()
+    usage = []
+    with router.tracking(usage):
+        assert router.generate("fast", "hi") == router.generate("fast", "hi")
+    assert len(router.calls) == 1
+    assert [u['cached'] for u in usage] == [False, True]
+    assert usage[1]['cost'] == 0.0
+
+
+def test_lazy_parts_only_resolve_on_a_miss(make_router):
+    router = make_router()
+    downloads = []
+
+    def image():
+        downloads.append(1)
+        return "IMG"
+
+    assert router.generate("fast", ["audit", image], cache_key="url") == "a: ['audit', 'IMG']"
+    router.generate("fast", ["audit", image], cache_key="url")
+    assert len(downloads) == 1
+
+
+def test_image_contents_without_cache_key_are_not_cached(make_router):
+    router = make_router()
+    router.generate("fast", ["audit", object()])
+    router.generate("fast", ["audit", object()])
+    assert len(router.calls) == 2
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from phash_index import PHashIndex, dhash_batch, group_near_duplicates
+
+
+def flip(h, bits):
+    for bit in bits:
+        h ^= 1 << bit
+    return h
+
+
+def test_query_matches_brute_force(tmp_path):
+    rng = random.Random(7)
+    index = PHashIndex(str(tmp_path / "hashes.sqlite"))
+    base = [rng.getrandbits(64) for _ in range(50)]
+    # Random hashes plus near copies of them at 1..10 flipped bits
+    items = [(f"r{i}", h) for i, h in enumerate(base)]
+    items += [(f"n{i}", flip(h, rng.sample(range(64), 1 + i % 10))) for i, h in enumerate(base)]
+    index.add_many(items)
+    for radius in (0, 3, 6, 10):
+        for key, h in items[::7]:
+            expected = sorted(((k, (v ^ h).bit_count()) for k, v in items if (v ^ h).bit_count() <= radius),
+                              key=lambda hit: (hit[1], hit[0]))
+            got = sorted(index.query(h, radius), key=lambda hit: (hit[1], hit[0]))
+            assert got == expected
+
+
+def test_hashes_persist_and_upserts_replace(tmp_path):
+    path = str(tmp_path / "hashes.sqlite")
+    index = PHashIndex(path)
+    top_bit = 1 << 63  # stored as a negative SQLite integer
+    index.add_many([("a", top_bit | 5), ("b", 42)])
+    index.add_many([("b", 43)])
+    reopened = PHashIndex(path)
+    assert len(reopened) == 2
+    assert reopened.query(top_bit | 5, 0) == [("a", 0)]
+    assert reopened.query(43, 0) == [("b", 0)]
+    assert reopened.query(42, 0) == []  # replaced by 43
+
+
+def test_dhash_ignores_brightness_and_scale():
+    rng = np.random.default_rng(0)
+    image = rng.uniform(0, 200, (1, 90, 160)).astype(np.float32)
+    other = rng.uniform(0, 200, (1, 90, 160)).astype(np.float32)
+    h, brighter, unrelated = dhash_batch(np.concatenate([image, image * 1.2 + 10, other]))
+    assert h == brighter
+    assert (h ^ unrelated).bit_count() > 16
+
+
+def test_group_near_duplicates(tmp_path):
+    index = PHashIndex(str(tmp_path / "hashes.sqlite"))
+    h = random.Random(1).getrandbits(64)
+    far = h ^ ((1 << 64) - 1)
+    df = pd.DataFrame({'Video ID': ["a", "b", "c", "d"],
+                       'Thumb Hash': [f"{h:016x}", f"{flip(h, [3, 40]):016x}", f"{far:016x}", None]})
+    index.add_frame(df)
+    assert group_near_duplicates(df, index) == [1, 1, None, None]
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resilience import CircuitOpen, DeadlineExceeded, Upstream, UpstreamError
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = type("Resp", (), {"status": status})()
+
+
+def upstream(**kwargs):
+    options = dict(timeout=0.2, deadline=2, retries=2, base_delay=0.001, max_delay=0.01, workers=4)
+    options.update(kwargs)
+    return Upstream("test", **options)
+
+
+def flaky(*errors, result="ok"):
+    """fn raising each of `errors` once, then returning `result`; calls are counted in fn.calls."""
+    pending = list(errors)
+
+    def fn():
+        fn.calls += 1
+        if pending:
+            raise pending.pop(0)
+        return result
+    fn.calls = 0
+    return fn
+
+
+def test_retries_retryable_errors():
+    api = upstream()
+    fn = flaky(HttpError(503), ConnectionError("reset"))
+    assert api.call(fn) == "ok"
+    assert fn.calls == 3
+    assert api.stats["retries"] == 2
+
+
+def test_non_retryable_error_is_raised_as_is():
+    api = upstream()
+    fn = flaky(HttpError(400))
+    with pytest.raises(HttpError):
+        api.call(fn)
+    assert fn.calls == 1
+    assert api.breaker.state == "closed"
+
+
+def test_exhausted_retries_serve_stale_result_for_key():
+    api = upstream(retries=1)
+    assert api.call(lambda: "fresh", key="k") == "fresh"
+    fn = flaky(HttpError(500), HttpError(500))
+    assert api.call(fn, key="k") == "fresh"
+    assert api.stats["stale_served"] == 1
+    with pytest.raises(UpstreamError) as error:
+        api.call(flaky(HttpError(500), HttpError(500)), key="other")
+    assert error.value.cause.resp.status == 500
+
+
+def test_attempt_timeout_and_deadline():
+    api = upstream(timeout=0.05, deadline=0.5, retries=0)
+    with pytest.raises(UpstreamError) as error:
+        api.call(time.sleep, 0.3)
+    assert isinstance(error.value.cause, DeadlineExceeded)
+
+
+def test_time_spent_queued_is_not_an_attempt_timeout():
+    api = upstream(timeout=0.15, deadline=2, retries=0, workers=1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(api.call, time.sleep, 0.1)
+        time.sleep(0.02)
+        # Waits ~0.1s for the only worker, then runs well within its timeout
+        second = pool.submit(api.call, time.sleep, 0.1)
+        first.result()
+        second.result()
+    assert api.stats["failed"] == 0
+
+
+def test_breaker_opens_and_fails_fast():
+    api = upstream(retries=0, failure_threshold=2, reset_after=60)
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            api.call(flaky(HttpError(503)))
+    assert api.breaker.state == "open"
+    fn = flaky()
+    with pytest.raises(UpstreamError) as error:
+        api.call(fn)
+    assert isinstance(error.value.cause, CircuitOpen)
+    assert fn.calls == 0
+
+
+def test_breaker_half_open_probe_closes_it():
+    api = upstream(retries=0, failure_threshold=1, reset_after=0.05)
+    with pytest.raises(UpstreamError):
+        api.call(flaky(HttpError(503)))
+    time.sleep(0.06)
+    assert api.call(lambda: "back") == "back"
+    assert api.breaker.state == "closed"
+
+
+def slow_then_fast(delay):
+    """First call sleeps `delay`, later calls answer at once."""
+    lock, calls = threading.Lock(), []
+
+    def fn():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        if first:
+            time.sleep(delay)
+            return "slow"
+        return "fast"
+    fn.calls = calls
+    return fn
+
+
+def test_hedges_reads_slower_than_p95():
+    api = upstream(timeout=1)
+    api.latencies.extend([0.01] * 20)
+    fn = slow_then_fast(0.5)
+    assert api.call(fn) == "fast"
+    assert api.stats["hedged"] == 1
+    assert len(fn.calls) == 2
+
+
+@pytest.mark.parametrize("options", [{"hedge": False}, {"idempotent": False}])
+def test_no_hedge_when_turned_off_per_call(options):
+    api = upstream(timeout=1)
+    api.latencies.extend([0.01] * 20)
+    fn = slow_then_fast(0.1)
+    assert api.call(fn, **options) == "slow"
+    assert api.stats["hedged"] == 0
+    assert len(fn.calls) == 1
+
+
+def test_identical_keyed_calls_share_one_attempt():
+    api, release = upstream(), threading.Event()
+    fn = flaky()
+
+    def blocked():
+        release.wait(5)
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(api.call, blocked, key="same") for _ in range(3)]
+        deadline = time.monotonic() + 5
+        while api.flights.shared < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        assert [f.result() for f in futures] == ["ok"] * 3
+    assert fn.calls == 1
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+from video_cache import BATCH_IDS, VideoStatsCache
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def item(vid):
+    return {'id': vid, 'statistics': {'viewCount': '1'}}
+
+
+# ---- SingleFlight ----
+
+def test_concurrent_callers_share_one_call():
+    flights, release, calls = SingleFlight(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flights.do, "key", slow) for _ in range(5)]
+        wait_until(lambda: flights.shared == 4)
+        release.set()
+        assert [f.result() for f in futures] == ["result"] * 5
+    assert len(calls) == 1
+    assert (flights.leaders, flights.shared) == (1, 4)
+    assert flights.flights == {}
+
+
+def test_error_is_shared_and_key_released():
+    flights, release = SingleFlight(), threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flights.do, "key", failing) for _ in range(3)]
+        wait_until(lambda: flights.shared == 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="upstream down"):
+                future.result()
+    # Nothing is remembered once the call finished: the next caller runs again
+    assert flights.do("key", lambda: "retried") == "retried"
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+    assert (flights.leaders, flights.shared) == (2, 0)
+
+
+# ---- VideoStatsCache.get_many ----
+
+def test_get_many_fetches_only_missing_ids_in_batches():
+    cache, requested = VideoStatsCache(), []
+
+    def fetch(ids):
+        requested.append(list(ids))
+        return [item(vid) for vid in ids if vid != "gone"]
+
+    ids = [f"v{i}" for i in range(BATCH_IDS + 10)] + ["gone"]
+    result = cache.get_many(ids + ["v0"], fetch)
+    assert [r['id'] for r in result] == ids[:-1]
+    assert [len(batch) for batch in requested] == [BATCH_IDS, 11]
+
+    # Cached and known-missing IDs are not requested again
+    requested.clear()
+    assert [r['id'] for r in cache.get_many(["v1", "gone", "new"], fetch)] == ["v1", "new"]
+    assert requested == [["new"]]
+
+
+def test_get_many_refetches_stale_ids():
+    cache, requested = VideoStatsCache(ttl=0), []
+
+    def fetch(ids):
+        requested.append(list(ids))
+        return [item(vid) for vid in ids]
+
+    cache.get_many(["a"], fetch)
+    cache.get_many(["a"], fetch)
+    assert requested == [["a"], ["a"]]
+
+
+def test_get_many_waiter_shares_leader_error():
+    cache, release, requested = VideoStatsCache(), threading.Event(), []
+
+    def failing(ids):
+        requested.append(list(ids))
+        release.wait(5)
+        raise RuntimeError("quota exceeded")
+
+    def other(ids):
+        requested.append(list(ids))
+        return [item(vid) for vid in ids]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(cache.get_many, ["a", "b"], failing)
+        wait_until(lambda: requested)
+        waiter = pool.submit(cache.get_many, ["b", "c"], other)
+        # The waiter fetches only the ID nobody else claimed, then waits on "b"
+        wait_until(lambda: len(requested) == 2)
+        release.set()
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            leader.result()
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            waiter.result()
+    assert requested == [["a", "b"], ["c"]]
+    assert cache.flights.flights == {}
+    # The failed IDs were not stored: the next call fetches them
+    assert [r['id'] for r in cache.get_many(["a", "b", "c"], other)] == ["a", "b", "c"]
+    assert requested[-1] == ["a", "b"]
+
+
+def test_get_many_keeps_batches_fetched_before_a_failure():
+    cache, requested = VideoStatsCache(), []
+    ids = [f"v{i}" for i in range(2 * BATCH_IDS)]
+
+    def fetch(batch):
+        requested.append(list(batch))
+        if len(requested) == 2:
+            raise RuntimeError("timeout")
+        return [item(vid) for vid in batch]
+
+    with pytest.raises(RuntimeError, match="timeout"):
+        cache.get_many(ids, fetch)
+    assert cache.flights.flights == {}
+    assert cache.stale(ids) == ids[BATCH_IDS:]
+
+    requested.clear()
+    assert len(cache.get_many(ids, fetch)) == len(ids)
+    assert requested == [ids[BATCH_IDS:]]
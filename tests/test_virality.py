@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from virality import QuantileSketch, ViralityScorer, virality_scope
+
+
+def frame(ids, raw):
+    return pd.DataFrame({'Video ID': ids, 'Virality Raw': raw})
+
+
+def test_sketch_percentiles_are_close_to_exact():
+    values = np.random.default_rng(0).lognormal(8, 2, 10000)
+    sketch = QuantileSketch()
+    sketch.add(values)
+    probes = np.quantile(values, [0.1, 0.5, 0.9, 0.99])
+    assert np.allclose(sketch.cdf(probes), [0.1, 0.5, 0.9, 0.99], atol=0.01)
+    assert list(QuantileSketch().cdf([1, 2])) == [0.5, 0.5]
+
+
+def test_score_is_a_stable_percentile(tmp_path):
+    scorer = ViralityScorer(str(tmp_path / "virality.sqlite"))
+    scorer.observe(["all"], frame([f"v{i}" for i in range(100)], np.arange(1, 101) * 1000.0))
+    scores = scorer.score("all", frame(["low", "high"], [1000.0, 100000.0]))
+    assert scores[0] < 1 and scores[1] > 9
+    # Re-observing the same videos changes nothing: each video counts once per scope
+    scorer.observe(["all"], frame([f"v{i}" for i in range(100)], np.arange(1, 101) * 1000.0))
+    assert list(scorer.score("all", frame(["low", "high"], [1000.0, 100000.0]))) == list(scores)
+
+
+def test_scopes_are_separate_and_persist(tmp_path):
+    path = str(tmp_path / "virality.sqlite")
+    scorer = ViralityScorer(path)
+    scorer.observe([virality_scope("Region", "US", "ai"), "all"], frame(["a", "b"], [10.0, 1e6]))
+    scorer.observe([virality_scope("Region", "IN", "ai"), "all"], frame(["c"], [5.0]))
+    reopened = ViralityScorer(path)
+    probe = frame(["x"], [1000.0])
+    assert reopened.score("region:US", probe)[0] == 5.0
+    assert reopened.score("region:IN", probe)[0] == 10.0
+    assert reopened.score("all", probe)[0] == round(10 * 2 / 3, 2)
+    assert reopened.score("niche:ai", probe)[0] == 5.0  # nothing seen yet: the midpoint
+
+
+def test_virality_scope():
+    assert virality_scope("All data", "US", "AI News") == "all"
+    assert virality_scope("Region", "US", "AI News") == "region:US"
+    assert virality_scope("Niche", "US", " AI News ") == "niche:ai news"
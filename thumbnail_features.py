@@ -0,0 +1,136 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from phash_index import dhash_batch
+
+# ==========================================
+# LOCAL THUMBNAIL FEATURES (PILLOW + NUMPY)
+# ==========================================
+# Cheap pre-screen for the whole result set before any vision-model call.
+# Thumbnails are downloaded in parallel, resized to one small 16:9 grid and
+# stacked into an (N, H, W, 3) array, so every feature below is a handful of
+# vectorized NumPy ops over the batch. Batches are at most CHUNK thumbnails:
+# a 5,000-video catalog is 20 small batches, not one multi-GB array, and only
+# the feature dicts outlive a batch. Results are cached by the SHA-1
+# of the image bytes (and URL -> hash, so repeat searches skip the download).
+# The same pass also produces each thumbnail's perceptual hash (phash_index.py).
+
+GRID = (160, 90)  # width, height
+BLOCK = 10  # px, for the text-area estimate
+EDGE_THRESHOLD = 40
+CHUNK = 256  # thumbnails downloaded, decoded and featurized per batch
+FEATURE_COLUMNS = ['Brightness', 'Contrast', 'Colorfulness', 'Edge Density', 'Text Area %', 'Palette']
+
+
+def _load(data):
+    img = Image.open(BytesIO(data)).convert("RGB")
+    w, h = img.size
+    if h / w > 0.6:
+        # hqdefault is 4:3 with letterbox bars: keep the 16:9 middle
+        crop = int(w * 9 / 16)
+        top = (h - crop) // 2
+        img = img.crop((0, top, w, top + crop))
+    return np.asarray(img.resize(GRID, Image.BILINEAR), dtype=np.float32)
+
+
+def batch_features(pixels):
+    """Feature dicts for an (N, H, W, 3) float32 RGB batch."""
+    r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    luma = 0.299 * r + 0.587 * g + 0.114 * b
+    flat = luma.reshape(len(pixels), -1)
+
+    # Hasler & Suesstrunk colorfulness
+    rg, yb = (r - g).reshape(len(pixels), -1), (0.5 * (r + g) - b).reshape(len(pixels), -1)
+    colorfulness = np.hypot(rg.std(1), yb.std(1)) + 0.3 * np.hypot(rg.mean(1), yb.mean(1))
+
+    # Gradient magnitude (forward differences) -> edge map
+    gx = np.abs(np.diff(luma, axis=2))[:, :-1, :]
+    gy = np.abs(np.diff(luma, axis=1))[:, :, :-1]
+    edges = (gx + gy) > EDGE_THRESHOLD
+    edge_density = edges.reshape(len(pixels), -1).mean(1)
+
+    # Text estimate: share of blocks that are both edge-dense and high-contrast
+    n, h, w = edges.shape
+    hb, wb = h // BLOCK, w // BLOCK
+    block_edges = edges[:, :hb * BLOCK, :wb * BLOCK].reshape(n, hb, BLOCK, wb, BLOCK).mean((2, 4))
+    block_std = luma[:, :hb * BLOCK, :wb * BLOCK].reshape(n, hb, BLOCK, wb, BLOCK).std((2, 4))
+    text_area = ((block_edges > 0.2) & (block_std > 50)).reshape(n, -1).mean(1)
+
+    # Dominant palette: 3 bits per channel (512 bins), one bincount for the whole batch
+    q = (pixels.astype(np.uint16) >> 5).reshape(n, -1, 3)
+    codes = (q[..., 0] << 6) | (q[..., 1] << 3) | q[..., 2]
+    counts = np.bincount((codes + np.arange(n)[:, None] * 512).ravel(), minlength=n * 512).reshape(n, 512)
+    top = np.argsort(-counts, axis=1)[:, :3]
+
+    hashes = dhash_batch(luma)
+
+    def to_hex(code):
+        rgb = [((code >> shift) & 7) * 32 + 16 for shift in (6, 3, 0)]
+        return "#" + "".join(f"{c:02x}" for c in rgb)
+
+    return [{
+        'Brightness': round(float(flat[i].mean()) / 2.55, 1),
+        'Contrast': round(float(flat[i].std()) / 1.275, 1),
+        'Colorfulness': round(float(colorfulness[i]), 1),
+        'Edge Density': round(float(edge_density[i]) * 100, 1),
+        'Text Area %': round(float(text_area[i]) * 100, 1),
+        'Palette': " ".join(to_hex(int(c)) for c in top[i]),
+        'Thumb Hash': f"{hashes[i]:016x}",
+    } for i in range(n)]
+
+
+class ThumbnailFeatureExtractor:
+    def __init__(self, fetch, workers=16, max_cached=50000):
+        self.fetch = fetch  # url -> image bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+        self.by_url, self.by_hash = {}, {}
+        self.max_cached = max_cached
+        self.lock = threading.Lock()
+
+    def _download(self, url):
+        try:
+            data = self.fetch(url)
+            return url, hashlib.sha1(data).hexdigest(), data
+        except Exception:
+            return url, None, None
+
+    def extract(self, urls):
+        """One feature dict (or None if the download failed) per URL, in order."""
+        with self.lock:
+            missing = list({u for u in urls if self.by_hash.get(self.by_url.get(u)) is None})
+        for start in range(0, len(missing), CHUNK):
+            self._extract_chunk(missing[start:start + CHUNK])
+        with self.lock:
+            return [self.by_hash.get(self.by_url.get(u)) for u in urls]
+
+    def _extract_chunk(self, urls):
+        fresh = {}
+        for url, digest, data in self.executor.map(self._download, urls):
+            if digest is None:
+                continue
+            with self.lock:
+                self.by_url[url] = digest
+            if digest not in self.by_hash and digest not in fresh:
+                try:
+                    fresh[digest] = _load(data)
+                except Exception:
+                    continue
+        if fresh:
+            features = batch_features(np.stack(list(fresh.values())))
+            with self.lock:
+                if len(self.by_hash) > self.max_cached:
+                    self.by_hash.clear()
+                self.by_hash.update(zip(fresh.keys(), features))
+
+    def add_columns(self, df):
+        """Return a copy of df with one sortable column per feature."""
+        features = self.extract(df['Thumbnail'].tolist())
+        out = df.copy()
+        for col in FEATURE_COLUMNS + ['Thumb Hash']:
+            out[col] = [f[col] if f else None for f in features]
+        return out
@@ -0,0 +1,117 @@
+import math
+import re
+from collections import Counter
+
+# ==========================================
+# TRANSCRIPT TOKEN REDUCTION (LOCAL, DETERMINISTIC)
+# ==========================================
+# Runs before prompt construction:
+#   1. strip caption cues ([Music], (laughs), >> markers), filler sounds and
+#      hedges set off by commas
+#   2. split into sentences (auto-captions have no punctuation -> fixed word chunks)
+#   3. drop exact and near-duplicate sentences (word-set Jaccard vs recent ones)
+#   4. if still over the token budget, keep the most informative sentences
+#      (TF-IDF-style score), in their original order
+# Tokens are estimated at ~4 characters each, which is close enough for budgeting.
+
+# Only known caption cues: real parentheticals ("iPhone 15 (Pro)") are content
+CUES = r"music|music playing|background music|applause|laughter|laughs|laughing|chuckles|cheering|cheers|" \
+       r"inaudible|crosstalk|silence|sighs|foreign|no audio|__"
+NOISE_RE = re.compile(rf"\[\s*(?:{CUES})\s*\]|\(\s*(?:{CUES})\s*\)|>>+|♪+", re.I)
+FILLER_RE = re.compile(r"\b(?:u+m+|u+h+|e+r+m*|a+h+|h+m+|m+h*m+)\b[,.]?\s*", re.I)
+# Hedges only when set off as a filler ("so, you know, it works"), never inside a
+# sentence ("what kind of camera", "I mean it.")
+HEDGE_RE = re.compile(r"(^|[,.!?])\s*(?:you know|i mean|kind of|sort of)\s*,\s*", re.I)
+REPEAT_RE = re.compile(r"\b(\w+)(?:\s+\1\b)+", re.I)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+WORD_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = set("""a an and are as at be but by for from has have he her his i if in into is it its
+just me my not of on or our so that the their them then there they this to was we were what when
+which who will with you your yeah okay ok like really very got get go going""".split())
+
+CHUNK_WORDS = 20
+DUP_WINDOW = 50
+DUP_JACCARD = 0.8
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _clean(text):
+    text = NOISE_RE.sub(" ", text)
+    text = FILLER_RE.sub("", text)
+    text = HEDGE_RE.sub(r"\1 ", text)
+    text = REPEAT_RE.sub(r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _sentences(text):
+    parts = [s for s in SENTENCE_RE.split(text) if s]
+    # Unpunctuated caption runs become fixed-size chunks; real sentences only split when huge
+    size = CHUNK_WORDS if len(parts) == 1 else CHUNK_WORDS * 2
+    out = []
+    for part in parts:
+        words = part.split()
+        out.extend(" ".join(words[i:i + size]) for i in range(0, len(words), size))
+    return out
+
+
+def _dedupe(sentences):
+    kept, kept_sets, seen = [], [], set()
+    for sentence in sentences:
+        words = frozenset(WORD_RE.findall(sentence.lower()))
+        key = " ".join(sorted(words))
+        if not words or key in seen:
+            continue
+        if any(len(words & prev) / len(words | prev) >= DUP_JACCARD for prev in kept_sets[-DUP_WINDOW:]):
+            continue
+        seen.add(key)
+        kept.append(sentence)
+        kept_sets.append(words)
+    return kept
+
+
+def _select(sentences, token_budget):
+    docs = [[w for w in WORD_RE.findall(s.lower()) if w not in STOPWORDS] for s in sentences]
+    doc_freq = Counter(w for doc in docs for w in set(doc))
+    term_freq = Counter(w for doc in docs for w in doc)
+    n = len(docs)
+
+    def score(i):
+        doc = docs[i]
+        if not doc:
+            return 0.0
+        weight = sum(math.log1p(term_freq[w]) * math.log((1 + n) / (1 + doc_freq[w])) for w in set(doc))
+        # The opening lines are the hook: always worth keeping
+        return weight / math.sqrt(len(doc)) + (1e6 if i < 2 else 0)
+
+    chosen, used = [], 0
+    for i in sorted(range(n), key=lambda i: (-score(i), i)):
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost > token_budget:
+            continue
+        chosen.append(i)
+        used += cost
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def prepare_transcript(text, token_budget=None):
+    """Return (reduced_text, report). `report` holds the token savings for this call."""
+    if not text:
+        return text, {'tokens_before': 0, 'tokens_after': 0, 'saved': 0, 'saved_pct': 0.0}
+    sentences = _dedupe(_sentences(_clean(text)))
+    reduced = " ".join(sentences)
+    if token_budget and estimate_tokens(reduced) > token_budget:
+        reduced = " ".join(_select(sentences, token_budget))
+    before, after = estimate_tokens(text), estimate_tokens(reduced)
+    return reduced, {
+        'tokens_before': before,
+        'tokens_after': after,
+        'saved': before - after,
+        'saved_pct': round((before - after) / before * 100, 1) if before else 0.0,
+    }
+
+
+def format_savings(report):
+    return f"🧹 Transcript trimmed {report['tokens_before']:,} → {report['tokens_after']:,} tokens (−{report['saved_pct']:.0f}%)"
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+from singleflight import SingleFlight
+
+# ==========================================
+# PER-VIDEO STATS CACHE
+# ==========================================
+# Related searches ("ai news", "ai news today") return mostly the same videos,
+# yet each whole-response cache miss used to re-list every ID. Raw
+# videos().list items are kept here per video ID for a few minutes, shared by
+# every query, region, channel catalog and session, so enrichment only asks
+# the API for IDs that are missing or stale. Items are stored as returned and
+# turned into table rows per fetch; earnings are priced outside every cache.
+# IDs the API did not return (private, deleted) are remembered too, so they
+# are not re-requested on every search either. An ID already being fetched
+# for another search is waited on rather than requested a second time.
+
+STATS_TTL = 15 * 60  # view counts move; a few minutes old is fine for market research
+MAX_VIDEOS = 200_000
+BATCH_IDS = 50  # videos().list takes at most 50 IDs per call (1 quota unit each)
+
+
+class VideoStatsCache:
+    def __init__(self, ttl=STATS_TTL, max_videos=MAX_VIDEOS):
+        self.ttl = ttl
+        self.max_videos = max_videos
+        self.lock = threading.Lock()
+        self.items = OrderedDict()  # video id -> (fetched at, item or None), oldest first
+        self.flights = SingleFlight()  # video id -> fetch in flight
+
+    def __len__(self):
+        return len(self.items)
+
+    def _fresh(self, video_id, now):
+        entry = self.items.get(video_id)
+        return entry is not None and now - entry[0] < self.ttl
+
+    def stale(self, video_ids):
+        """The IDs in video_ids (deduplicated, in order) that have to be fetched."""
+        now = time.time()
+        with self.lock:
+            return [vid for vid in dict.fromkeys(video_ids) if not self._fresh(vid, now)]
+
+    def put(self, video_ids, items):
+        """Store the items returned for a request of video_ids; IDs without an item are stored as missing."""
+        now = time.time()
+        by_id = {item['id']: item for item in items}
+        with self.lock:
+            for vid in video_ids:
+                self.items.pop(vid, None)
+                self.items[vid] = (now, by_id.get(vid))
+            while len(self.items) > self.max_videos:
+                self.items.popitem(last=False)
+
+    def get_many(self, video_ids, fetch):
+        """videos().list items for video_ids, in order; fetch(ids) is called per batch of missing or stale IDs."""
+        wanted = list(dict.fromkeys(video_ids))
+        claims = {vid: self.flights.begin(vid) for vid in self.stale(wanted)}
+        mine = {vid: future for vid, (future, leader) in claims.items() if leader}
+        try:
+            for vid in set(mine) - set(self.stale(mine)):  # fetched by someone else while we were claiming
+                self.flights.finish(vid, mine.pop(vid))
+            batches = list(mine)
+            for start in range(0, len(batches), BATCH_IDS):
+                batch = batches[start:start + BATCH_IDS]
+                self.put(batch, fetch(batch))
+                for vid in batch:
+                    self.flights.finish(vid, mine.pop(vid))
+        except BaseException as e:
+            for vid, future in mine.items():
+                self.flights.finish(vid, future, error=e)
+            raise
+        for future, leader in claims.values():
+            if not leader:
+                future.result()
+        with self.lock:
+            entries = [self.items.get(vid) for vid in wanted]
+        return [entry[1] for entry in entries if entry is not None and entry[1] is not None]
@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+# ==========================================
+# STREAMING-STABLE VIRALITY SCORE
+# ==========================================
+# Instead of `raw / max(raw) * 10` inside one fetch (which moves with every
+# page and every outlier), a video's score is its percentile against a running
+# quantile sketch of everything seen in the chosen scope ("all", one region,
+# one niche), times 10. Sketches are log-bucketed histograms (~1% relative
+# accuracy, fixed 1,500 buckets): inserting a video and looking up its
+# percentile are O(1), and a whole page is scored with one vectorized pass.
+# Each video counts once per scope; sketches persist in SQLite so scores stay
+# comparable across searches, sessions and restarts.
+
+GAMMA = 1.02
+BUCKETS = 1500  # gamma ** 1500 ~ 8e12, above any real view count
+COMPONENT, COLUMN = 'virality', 'Virality Raw'  # the one sketched column (the table keeps a component key)
+
+
+class QuantileSketch:
+    def __init__(self, counts=None):
+        self.counts = counts if counts is not None else np.zeros(BUCKETS, dtype=np.int64)
+        self._cum = None
+
+    @staticmethod
+    def bucket(values):
+        values = np.log1p(np.maximum(np.asarray(values, dtype=np.float64), 0))
+        return np.clip(np.ceil(values / np.log(GAMMA)), 0, BUCKETS - 1).astype(np.int64)
+
+    def add(self, values):
+        np.add.at(self.counts, self.bucket(values), 1)
+        self._cum = None
+
+    def cdf(self, values):
+        """Mid-rank percentile in [0, 1] of each value."""
+        total = self.counts.sum()
+        if total == 0:
+            return np.full(len(values), 0.5)
+        if self._cum is None:
+            self._cum = np.cumsum(self.counts)
+        idx = self.bucket(values)
+        below = self._cum[idx] - self.counts[idx]
+        return (below + 0.5 * self.counts[idx]) / total
+
+
+class ViralityScorer:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS sketches (scope TEXT, component TEXT, counts BLOB, PRIMARY KEY (scope, component))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sketch_seen (scope TEXT, video_id TEXT, PRIMARY KEY (scope, video_id))")
+        self.sketches = {}
+        for scope, blob in self.db.execute("SELECT scope, counts FROM sketches WHERE component = ?", (COMPONENT,)):
+            self.sketches[scope] = QuantileSketch(np.frombuffer(blob, dtype=np.int64).copy())
+
+    def _sketch(self, scope):
+        return self.sketches.setdefault(scope, QuantileSketch())
+
+    def observe(self, scopes, df):
+        """Add every video not yet seen in each scope to that scope's sketches."""
+        if df.empty:
+            return
+        ids = df['Video ID'].tolist()
+        with self.lock:
+            for scope in scopes:
+                seen = set()
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    seen.update(r[0] for r in self.db.execute(
+                        f"SELECT video_id FROM sketch_seen WHERE scope = ? AND video_id IN ({','.join('?' * len(batch))})", [scope, *batch]))
+                fresh = ~df['Video ID'].isin(seen).to_numpy()
+                if not fresh.any():
+                    continue
+                sketch = self._sketch(scope)
+                sketch.add(df.loc[fresh, COLUMN].to_numpy())
+                self.db.execute("INSERT OR REPLACE INTO sketches VALUES (?, ?, ?)", (scope, COMPONENT, sketch.counts.tobytes()))
+                self.db.executemany("INSERT OR IGNORE INTO sketch_seen VALUES (?, ?)", [(scope, vid) for vid in df.loc[fresh, 'Video ID']])
+            self.db.commit()
+
+    def score(self, scope, df):
+        """0-10 virality score: percentile of Virality Raw within `scope`."""
+        with self.lock:
+            return np.round(self._sketch(scope).cdf(df[COLUMN].to_numpy()) * 10, 2)
+
+
+def virality_scope(baseline, region, query):
+    if baseline == "Region":
+        return f"region:{region}"
+    if baseline == "Niche":
+        return f"niche:{query.strip().lower()}"
+    return "all"